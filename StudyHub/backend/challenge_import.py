@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+# CSV layout: one challenge per line, list cells separated by ";" or "|"
+#   title,description,level,creator_name,creator_id,start_date,end_date,max_participants,tasks,participants
+LIST_SEPARATOR = re.compile(r"[;|]")
+
+
+# ============================================================
+# Parsing
+# ============================================================
+def parse_import_file(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """JSON (a list, or {"challenges": [...]}) or CSV, chosen by file extension."""
+    text = content.decode("utf-8-sig")
+
+    if filename.lower().endswith(".csv"):
+        rows = []
+        for record in csv.DictReader(io.StringIO(text)):
+            row = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in record.items() if k}
+            for key in ("tasks", "participants"):
+                cell = row.get(key) or ""
+                row[key] = [part.strip() for part in LIST_SEPARATOR.split(cell) if part.strip()]
+            for key in ("description", "level", "max_participants"):
+                if row.get(key) == "":
+                    row.pop(key)
+            rows.append(row)
+        return rows
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("challenges", [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of challenges")
+    return data
+
+
+# ============================================================
+# Import
+# ============================================================
+def _validate(raw_rows: List[Any]):
+    valid: List[tuple] = []
+    errors: List[dict] = []
+
+    for row_no, raw in enumerate(raw_rows, start=1):
+        if not isinstance(raw, dict):
+            errors.append({"row": row_no, "errors": ["Expected an object"]})
+            continue
+        try:
+            item = schemas.ChallengeCreate(**raw)
+        except ValidationError as e:
+            errors.append({
+                "row": row_no,
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()],
+            })
+            continue
+
+        problems = []
+        if item.end_date < item.start_date:
+            problems.append("end_date: must not be before start_date")
+
+        participants = list(dict.fromkeys(item.participants))
+        if item.creator_id not in participants:
+            participants.append(item.creator_id)
+        if len(participants) > item.max_participants:
+            problems.append("participants: more than max_participants")
+
+        tasks = [t.strip() for t in item.tasks if t.strip()]
+
+        if problems:
+            errors.append({"row": row_no, "errors": problems})
+        else:
+            valid.append((row_no, item, tasks, participants))
+
+    return valid, errors
+
+
+def import_challenges(db: Session, raw_rows: List[Any], dry_run: bool = False) -> dict:
+    """
+    Validate every row, then insert all valid challenges and their tasks with
+    batched executemany INSERTs in a single transaction.
+    Invalid rows are reported and skipped; they never abort the batch.
+    """
+    valid, errors = _validate(raw_rows)
+
+    # creators must exist (FK) - one query for the whole file
+    creator_ids = {item.creator_id for _, item, _, _ in valid}
+    known = {
+        uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(creator_ids)).all()
+    } if creator_ids else set()
+
+    rows = []
+    for entry in valid:
+        row_no, item = entry[0], entry[1]
+        if item.creator_id in known:
+            rows.append(entry)
+        else:
+            errors.append({"row": row_no, "errors": ["creator_id: user not found"]})
+
+    errors.sort(key=lambda e: e["row"])
+
+    report = {"valid": len(rows), "created": 0, "challenge_ids": [], "errors": errors}
+    if dry_run or not rows:
+        return report
+
+    now = datetime.utcnow()
+    challenge_values = [
+        {
+            "title": item.title,
+            "description": item.description,
+            "level": item.level,
+            "creator_name": item.creator_name,
+            "creator_id": item.creator_id,
+            "start_date": item.start_date,
+            "end_date": item.end_date,
+            "max_participants": item.max_participants,
+            "participants": participants,
+            "participants_count": len(participants),
+            "comment_count": 0,
+            "last_activity_at": now,
+            # progress prebuilt: every member starts with an empty task mask
+            "progress": {str(uid): 0 for uid in participants},
+            "group_progress": 0,
+        }
+        for _, item, tasks, participants in rows
+    ]
+
+    challenge_ids = db.execute(
+        insert(models.Challenge).returning(models.Challenge.id, sort_by_parameter_order=True),
+        challenge_values,
+    ).scalars().all()
+
+    task_values = [
+        {"challenge_id": challenge_id, "title": title, "bit": idx, "position": idx}
+        for challenge_id, (_, _, tasks, _) in zip(challenge_ids, rows)
+        for idx, title in enumerate(tasks)
+    ]
+    if task_values:
+        db.execute(insert(models.ChallengeTask), task_values)
+
+    db.commit()
+    report["created"] = len(challenge_ids)
+    report["challenge_ids"] = list(challenge_ids)
+    return report
@@ -1,102 +1,256 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import false, func, inspect, null, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, load_only, noload, selectinload, undefer, with_expression
 from datetime import datetime
 from . import models, schemas
-from .database import SessionLocal
+from .database import get_db, get_read_db, pin_user
+from .ranking import bump_score
+from .challenge_import import import_challenges, parse_import_file
+from .profiler import require_admin
+from .ratelimit import rate_limit
+from .conditional import make_etag, not_modified
+from .task_bits import (
+    assign_task_bits,
+    done_count,
+    next_free_bit,
+    ordered_tasks,
+    progress_array,
+    task_bit_map,
+    tasks_mask,
+    to_mask,
+)
 import json
 from typing import List, Optional
 
 router = APIRouter(prefix="/api/challenges", tags=["challenges"])
 
 
-# ============================================================
-# Database Dependency
-# ============================================================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ============================================================
 # Group Progress
 # ============================================================
 def recompute_group_progress(challenge: models.Challenge) -> None:
     """
     متوسط نسبة إنجاز جميع المشاركين
-    progress = { "user_id": [0/1, 0/1, ...] }
+    progress = { "user_id": bitmask }
     """
     progress = challenge.progress or {}
+    bits = task_bit_map(challenge.tasks)
+    total = len(bits)
+    all_mask = tasks_mask(bits)
     all_pcts: List[float] = []
 
-    for arr in progress.values():
-        if not isinstance(arr, list) or not arr:
-            continue
-        vals = [1 if bool(x) else 0 for x in arr]
-        pct = (sum(vals) / len(vals)) * 100
-        all_pcts.append(pct)
+    if total:
+        for value in progress.values():
+            all_pcts.append(done_count(value, all_mask) / total * 100)
 
     challenge.group_progress = round(sum(all_pcts) / len(all_pcts), 2) if all_pcts else 0.0
 
 
 # ============================================================
-# Prepare Output for Frontend
+# Loading
 # ============================================================
-def format_challenge_response(challenge: models.Challenge, current_user_id: Optional[int]):
-    participants = challenge.participants or []
-    participants_count = len(participants)
+# everything a full response / progress write needs, in two queries (row + tasks)
+FULL_LOAD = (
+    undefer(models.Challenge.participants),
+    undefer(models.Challenge.progress),
+    selectinload(models.Challenge.tasks),
+)
+
 
-    is_creator = current_user_id is not None and challenge.creator_id == current_user_id
-    is_joined = current_user_id is not None and current_user_id in participants
+def _load_challenge(
+    db: Session, challenge_id: int, *options, for_update: bool = False
+) -> Optional[models.Challenge]:
+    q = db.query(models.Challenge).options(*options).filter(models.Challenge.id == challenge_id)
+    if for_update:
+        # progress writers read-modify-write the JSONB and apply score deltas from it:
+        # serialize them per challenge so user_scores stays equal to the set bits
+        q = q.with_for_update(of=models.Challenge)
+    return q.first()
 
+
+# ============================================================
+# Prepare Output for Frontend
+# ============================================================
+def challenge_status(start_date, end_date) -> str:
     today = datetime.utcnow().date()
-    if challenge.start_date and today < challenge.start_date:
-        status = "Upcoming"
-    elif challenge.end_date and today > challenge.end_date:
-        status = "Ended"
-    else:
-        status = "Active"
+    if start_date and today < start_date:
+        return "Upcoming"
+    if end_date and today > end_date:
+        return "Ended"
+    return "Active"
 
-    # progress map
-    progress_map = challenge.progress or {}
+
+def user_tasks(tasks: List[dict], progress_map: dict, current_user_id: Optional[int]) -> List[dict]:
+    """tasks = [{"id", "title"}, ...] in display order -> adds the viewer's "done" flag"""
     user_key = str(current_user_id) if current_user_id else None
     user_progress_arr = progress_map.get(user_key, []) if user_key else []
 
-    # ترتيب المهام حسب ID
-    all_tasks = sorted(challenge.tasks, key=lambda t: t.id)
-
     tasks_out = []
-    for idx, t in enumerate(all_tasks):
+    for idx, t in enumerate(tasks):
         done = False
         if user_key and idx < len(user_progress_arr):
             done = bool(user_progress_arr[idx])
 
         tasks_out.append({
-            "id": t.id,
-            "title": t.title,
+            "id": t["id"],
+            "title": t["title"],
             "done": done,
         })
+    return tasks_out
+
+
+# ============================================================
+# Response Views (sparse fieldsets)
+# ============================================================
+CHALLENGE_FIELDS = tuple(schemas.ChallengeResponse.model_fields)
+
+CARD_FIELDS = (
+    "id", "title", "level", "creator_name", "creator_id", "start_date", "end_date", "status",
+    "participants_count", "max_participants", "comment_count", "last_activity_at",
+    "group_progress", "is_creator", "is_joined",
+)
+
+CHALLENGE_VIEWS = {
+    "card": CARD_FIELDS,
+    "detail": CARD_FIELDS + ("description", "tasks"),
+    "full": CHALLENGE_FIELDS,
+}
+
+# response fields copied straight from the column of the same name
+_PLAIN_FIELDS = (
+    "id", "title", "description", "level", "creator_name", "creator_id",
+    "start_date", "end_date", "max_participants", "last_activity_at",
+)
+
+# response field -> columns it needs, when that is not just the column of the same name
+_FIELD_COLUMNS = {
+    "status": ("start_date", "end_date"),
+    "is_creator": ("creator_id",),
+    "is_joined": (),  # viewer_joined expression
+    "tasks": (),      # tasks relationship + viewer_progress expression
+}
+
+
+def challenge_fields(
+    view: str = Query("full", pattern="^(card|detail|full)$"),
+    fields: Optional[str] = Query(None, description="Comma separated response fields; overrides view"),
+) -> tuple:
+    if not fields:
+        return CHALLENGE_VIEWS[view]
+
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in CHALLENGE_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *wanted]))
+
+
+def challenge_load_options(fields: tuple, current_user_id: Optional[int]) -> list:
+    """Loader options that fetch exactly the columns `fields` is computed from."""
+    columns = {"id"}
+    for name in fields:
+        columns.update(_FIELD_COLUMNS.get(name, (name,)))
+
+    # load_only() re-defers every other column, so it has to carry strict mode over itself
+    options = [
+        load_only(*(getattr(models.Challenge, c) for c in sorted(columns)), raiseload=models.STRICT_LOADING)
+    ]
+
+    if "tasks" in fields or "progress" in fields:
+        options.append(selectinload(models.Challenge.tasks))
+    else:
+        options.append(noload(models.Challenge.tasks))
+
+    # membership / own progress straight from SQL instead of shipping the whole blob
+    if "is_joined" in fields and "participants" not in columns:
+        joined = (
+            models.Challenge.participants.contains([current_user_id])
+            if current_user_id is not None else false()
+        )
+        options.append(with_expression(models.Challenge.viewer_joined, joined))
+    if "tasks" in fields and "progress" not in columns:
+        mine = models.Challenge.progress[str(current_user_id)] if current_user_id is not None else null()
+        options.append(with_expression(models.Challenge.viewer_progress, mine))
+
+    return options
+
+
+def viewer_mask(challenge: models.Challenge, current_user_id: Optional[int]):
+    if "progress" in inspect(challenge).unloaded:
+        return challenge.viewer_progress
+    return (challenge.progress or {}).get(str(current_user_id))
+
+
+def format_challenge_response(
+    challenge: models.Challenge, current_user_id: Optional[int], fields: tuple = CHALLENGE_FIELDS
+):
+    """Builds only the requested fields, so columns left unloaded are never touched."""
+    out = {name: getattr(challenge, name) for name in fields if name in _PLAIN_FIELDS}
+
+    if "status" in fields:
+        out["status"] = challenge_status(challenge.start_date, challenge.end_date)
+    if "participants" in fields:
+        out["participants"] = challenge.participants or []
+    if "participants_count" in fields:
+        out["participants_count"] = challenge.participants_count or 0
+    if "comment_count" in fields:
+        out["comment_count"] = challenge.comment_count or 0
+    if "group_progress" in fields:
+        out["group_progress"] = challenge.group_progress or 0
+    if "is_creator" in fields:
+        out["is_creator"] = current_user_id is not None and challenge.creator_id == current_user_id
+    if "is_joined" in fields:
+        if "participants" in inspect(challenge).unloaded:
+            out["is_joined"] = bool(challenge.viewer_joined)
+        else:
+            out["is_joined"] = current_user_id is not None and current_user_id in (challenge.participants or [])
+
+    if "tasks" in fields or "progress" in fields:
+        # ترتيب المهام حسب الترتيب المعروض
+        all_tasks = ordered_tasks(challenge.tasks)
+        bits = task_bit_map(all_tasks)
+
+    if "progress" in fields:
+        # progress map: stored masks -> 0/1 per task in display order
+        out["progress"] = {
+            user_key: progress_array(value, all_tasks, bits)
+            for user_key, value in (challenge.progress or {}).items()
+        }
+
+    if "tasks" in fields:
+        mine = {}
+        if current_user_id:
+            mine[str(current_user_id)] = progress_array(viewer_mask(challenge, current_user_id), all_tasks, bits)
+        out["tasks"] = user_tasks([{"id": t.id, "title": t.title} for t in all_tasks], mine, current_user_id)
 
+    return out
+
+
+DASHBOARD_CARD_FIELDS = (
+    "title", "status", "end_date", "group_progress", "participants_count",
+    "comment_count", "last_activity_at", "tasks",
+)
+
+
+def challenge_card(challenge: models.Challenge, current_user_id: int) -> dict:
+    """Compact summary for dashboards: counts instead of task/participant/progress lists."""
+    bits = task_bit_map(challenge.tasks)
+    total = len(bits)
+    done = done_count(viewer_mask(challenge, current_user_id), tasks_mask(bits))
     return {
         "id": challenge.id,
         "title": challenge.title,
-        "description": challenge.description,
-        "level": challenge.level,
-        "creator_name": challenge.creator_name,
-        "creator_id": challenge.creator_id,
-        "start_date": challenge.start_date,
+        "status": challenge_status(challenge.start_date, challenge.end_date),
         "end_date": challenge.end_date,
-        "tasks": tasks_out,
-        "participants": participants,
-        "participants_count": participants_count,
-        "progress": progress_map,
+        "tasks_total": total,
+        "tasks_done": done,
+        "my_progress": round(done / total * 100, 2) if total else 0.0,
         "group_progress": challenge.group_progress or 0,
-        "max_participants": challenge.max_participants,
-        "status": status,
-        "is_creator": is_creator,
-        "is_joined": is_joined,
+        "participants_count": challenge.participants_count or 0,
+        "comment_count": challenge.comment_count or 0,
+        "last_activity_at": challenge.last_activity_at,
     }
 
 
@@ -123,47 +277,157 @@ def create_challenge(challenge: schemas.ChallengeCreate, db: Session = Depends(g
     if challenge.creator_id not in new_challenge.participants:
         new_challenge.participants.append(challenge.creator_id)
 
-    # Create tasks
-    for title in challenge.tasks or []:
-        title = title.strip()
-        if title:
-            new_challenge.tasks.append(models.ChallengeTask(title=title))
+    # Create tasks (bit i, shown in the order given)
+    titles = [t.strip() for t in challenge.tasks or [] if t.strip()]
+    for idx, title in enumerate(titles):
+        new_challenge.tasks.append(models.ChallengeTask(title=title, bit=idx, position=idx))
 
-    # Prepare progress arrays
-    tasks_count = len(new_challenge.tasks)
-    progress_map = {}
-    for uid in new_challenge.participants:
-        progress_map[str(uid)] = [0] * tasks_count
-
-    new_challenge.progress = progress_map
+    # Empty progress mask per participant
+    new_challenge.progress = {str(uid): 0 for uid in new_challenge.participants}
+    new_challenge.participants_count = len(new_challenge.participants)
+    new_challenge.last_activity_at = datetime.utcnow()
     recompute_group_progress(new_challenge)
 
     db.add(new_challenge)
+    pin_user(db, challenge.creator_id)
+    db.flush()
+    challenge_id = new_challenge.id
     db.commit()
-    db.refresh(new_challenge)
+    new_challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
 
     return format_challenge_response(new_challenge, challenge.creator_id)
 
 
+# ============================================================
+# Bulk Import
+# ============================================================
+@router.post("/import", response_model=schemas.ChallengeImportReport, dependencies=[Depends(require_admin)])
+def bulk_import_challenges(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    try:
+        rows = parse_import_file(file.filename or "", file.file.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(400, f"Could not read import file: {e}")
+
+    return import_challenges(db, rows, dry_run=dry_run)
+
+
 # ============================================================
 # Get Challenges
 # ============================================================
-@router.get("", response_model=List[schemas.ChallengeResponse])
-def get_challenges(current_user_id: int = Query(None), db: Session = Depends(get_db)):
-    challenges = db.query(models.Challenge).all()
-    return [format_challenge_response(c, current_user_id) for c in challenges]
+CHALLENGE_SORTS = {
+    "newest": (models.Challenge.id.desc(),),
+    "active": (models.Challenge.last_activity_at.desc().nullslast(), models.Challenge.id.desc()),
+    "discussed": (models.Challenge.comment_count.desc(), models.Challenge.id.desc()),
+    "almost_full": (
+        (models.Challenge.max_participants - models.Challenge.participants_count).asc(),
+        models.Challenge.id.desc(),
+    ),
+}
+
+
+@router.get("", response_model=List[schemas.ChallengeView], response_model_exclude_unset=True)
+def get_challenges(
+    current_user_id: int = Query(None),
+    sort: Optional[str] = Query(None, pattern="^(newest|active|discussed|almost_full)$"),
+    fields: tuple = Depends(challenge_fields),
+    db: Session = Depends(get_read_db),
+):
+    q = db.query(models.Challenge)
+    if sort:
+        q = q.order_by(*CHALLENGE_SORTS[sort])
+    return list_challenge_views(db, q, current_user_id, fields)
+
+
+# ============================================================
+# Search
+# ============================================================
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.get("/search", response_model=List[schemas.ChallengeView], response_model_exclude_unset=True)
+def search_challenges(
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user_id: int = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: tuple = Depends(challenge_fields),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Ranked full-text search over title / level / description.
+    Falls back to trigram similarity on the title so prefixes and typos still match.
+    """
+    term = q.strip()
+    if not term:
+        raise HTTPException(400, "Empty query")
+
+    ts_query = func.websearch_to_tsquery("english", term)
+    text_rank = func.ts_rank_cd(models.Challenge.search_vector, ts_query)
+    title_similarity = func.similarity(models.Challenge.title, term)
+
+    matches = or_(
+        models.Challenge.search_vector.op("@@")(ts_query),
+        models.Challenge.title.op("%")(term),  # pg_trgm similarity threshold
+        models.Challenge.title.ilike(f"{_escape_like(term)}%"),
+    )
+
+    q = (
+        db.query(models.Challenge)
+        .filter(matches)
+        .order_by(func.greatest(text_rank, title_similarity).desc(), models.Challenge.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return list_challenge_views(db, q, current_user_id, fields)
 
 
 # ============================================================
 # Get Single
 # ============================================================
-@router.get("/{challenge_id}", response_model=schemas.ChallengeResponse)
-def get_challenge(challenge_id: int, current_user_id: int = Query(None), db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+@router.get("/{challenge_id}", response_model=schemas.ChallengeView, response_model_exclude_unset=True)
+def get_challenge(
+    challenge_id: int,
+    request: Request,
+    response: Response,
+    current_user_id: int = Query(None),
+    fields: tuple = Depends(challenge_fields),
+    db: Session = Depends(get_read_db),
+):
+    # cheap version probe first; status depends on the date, so today is part of the tag
+    version = (
+        db.query(models.Challenge.updated_at, *LIVE_COUNTERS)
+        .filter(models.Challenge.id == challenge_id)
+        .first()
+    )
+    if not version:
+        raise HTTPException(404, "Challenge not found")
+    etag = make_etag("challenge", challenge_id, *version, current_user_id, fields, datetime.utcnow().date())
+    cached = not_modified(request, response, etag, version.updated_at)
+    if cached:
+        return cached
+
+    snapshot = db.get(
+        models.ChallengeSnapshot, challenge_id, options=[undefer(models.ChallengeSnapshot.payload)]
+    )
+    if snapshot:
+        data = format_snapshot_response(snapshot, current_user_id, version)
+        return {name: data[name] for name in fields if name in data}
+
+    challenge = (
+        db.query(models.Challenge)
+        .options(*challenge_load_options(fields, current_user_id))
+        .filter(models.Challenge.id == challenge_id)
+        .first()
+    )
     if not challenge:
         raise HTTPException(404, "Challenge not found")
 
-    return format_challenge_response(challenge, current_user_id)
+    return format_challenge_response(challenge, current_user_id, fields)
 
 
 # ============================================================
@@ -171,7 +435,7 @@ def get_challenge(challenge_id: int, current_user_id: int = Query(None), db: Ses
 # ============================================================
 @router.post("/{challenge_id}/join", response_model=schemas.ChallengeResponse)
 def join_challenge(challenge_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD, for_update=True)
     if not challenge:
         raise HTTPException(404, "Challenge not found")
 
@@ -199,17 +463,19 @@ def join_challenge(challenge_id: int, user_id: int = Query(...), db: Session = D
 
     participants.append(user_id)
     challenge.participants = participants
+    challenge.participants_count = len(participants)
+    challenge.last_activity_at = datetime.utcnow()
 
     # Add progress row
-    tasks_count = len(challenge.tasks)
-    progress_map = challenge.progress or {}
-    progress_map[str(user_id)] = [0] * tasks_count
+    # copy: in-place edits of the JSONB dict are not detected as changes
+    progress_map = dict(challenge.progress or {})
+    progress_map[str(user_id)] = 0
     challenge.progress = progress_map
 
     recompute_group_progress(challenge)
 
     db.commit()
-    db.refresh(challenge)
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
 
     return format_challenge_response(challenge, user_id)
 
@@ -217,9 +483,13 @@ def join_challenge(challenge_id: int, user_id: int = Query(...), db: Session = D
 # ============================================================
 # Toggle Task
 # ============================================================
-@router.patch("/{challenge_id}/task-toggle", response_model=schemas.ChallengeResponse)
+@router.patch(
+    "/{challenge_id}/task-toggle",
+    response_model=schemas.ChallengeResponse,
+    dependencies=[Depends(rate_limit("task-toggle", per_minute=60, burst=20))],
+)
 def toggle_task(challenge_id: int, user_id: int = Query(...), task_id: int = Query(...), db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD, for_update=True)
     if not challenge:
         raise HTTPException(404, "Challenge not found")
 
@@ -230,35 +500,26 @@ def toggle_task(challenge_id: int, user_id: int = Query(...), task_id: int = Que
     if user_id not in (challenge.participants or []):
         raise HTTPException(403, "Join first")
 
-    # Get all tasks sorted
-    all_tasks = sorted(challenge.tasks, key=lambda t: t.id)
-    tasks_count = len(all_tasks)
-
-    # Build progress row
-    progress_map = challenge.progress or {}
-    user_key = str(user_id)
-
-    if user_key not in progress_map or len(progress_map[user_key]) != tasks_count:
-        progress_map[user_key] = [0] * tasks_count
-
-    # Find task index
-    index = None
-    for idx, t in enumerate(all_tasks):
-        if t.id == task_id:
-            index = idx
-            break
-
-    if index is None:
+    task = next((t for t in challenge.tasks if t.id == task_id), None)
+    if task is None:
         raise HTTPException(404, "Task not found")
 
-    # Toggle (0/1)
-    progress_map[user_key][index] = 1 - progress_map[user_key][index]
+    # legacy tasks get their bits persisted before the first mask write
+    assign_task_bits(challenge.tasks)
+
+    # Toggle the task's bit
+    progress_map = dict(challenge.progress or {})
+    user_key = str(user_id)
+    mask = to_mask(progress_map.get(user_key)) ^ (1 << task.bit)
+    progress_map[user_key] = mask
 
     challenge.progress = progress_map
+    challenge.last_activity_at = datetime.utcnow()
     recompute_group_progress(challenge)
+    bump_score(db, user_id, tasks=1 if (mask >> task.bit) & 1 else -1)
 
     db.commit()
-    db.refresh(challenge)
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
 
     return format_challenge_response(challenge, user_id)
 
@@ -268,61 +529,154 @@ def toggle_task(challenge_id: int, user_id: int = Query(...), task_id: int = Que
 # ============================================================
 @router.delete("/{challenge_id}/leave", response_model=schemas.ChallengeResponse)
 def leave_challenge(challenge_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD, for_update=True)
     if not challenge:
         raise HTTPException(404, "Challenge not found")
 
+    today = datetime.utcnow().date()
+    if challenge.end_date and today > challenge.end_date:
+        raise HTTPException(400, "Challenge already ended")
+
     participants = list(challenge.participants or [])
     if user_id not in participants:
         raise HTTPException(400, "User not joined")
 
     participants.remove(user_id)
     challenge.participants = participants
+    challenge.participants_count = len(participants)
+    challenge.last_activity_at = datetime.utcnow()
 
     # Remove from progress
-    progress_map = challenge.progress or {}
-    progress_map.pop(str(user_id), None)
+    progress_map = dict(challenge.progress or {})
+    removed = progress_map.pop(str(user_id), None)
     challenge.progress = progress_map
 
     recompute_group_progress(challenge)
+    bump_score(db, user_id, tasks=-done_count(removed, tasks_mask(task_bit_map(challenge.tasks))))
 
     db.commit()
-    db.refresh(challenge)
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
 
     return format_challenge_response(challenge, user_id)
 
 
 # ============================================================
-# Leaderboard
+# Edit Tasks (creator only)
 # ============================================================
-@router.get("/{challenge_id}/leaderboard")
-def get_leaderboard(challenge_id: int, db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+def _editable_challenge(db: Session, challenge_id: int, user_id: int) -> models.Challenge:
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD, for_update=True)
     if not challenge:
         raise HTTPException(404, "Challenge not found")
 
+    if challenge.creator_id != user_id:
+        raise HTTPException(403, "Only the creator can edit tasks")
+
+    today = datetime.utcnow().date()
+    if challenge.end_date and today > challenge.end_date:
+        raise HTTPException(400, "Challenge already ended")
+
+    assign_task_bits(challenge.tasks)
+    return challenge
+
+
+@router.post("/{challenge_id}/tasks", response_model=schemas.ChallengeResponse)
+def add_task(challenge_id: int, payload: schemas.ChallengeTaskCreate, user_id: int = Query(...), db: Session = Depends(get_db)):
+    title = payload.title.strip()
+    if not title:
+        raise HTTPException(400, "Empty task title")
+
+    challenge = _editable_challenge(db, challenge_id, user_id)
+
+    # a fresh bit: nobody's mask has it set, so existing progress is untouched
+    position = max((t.position for t in challenge.tasks), default=-1) + 1
+    challenge.tasks.append(
+        models.ChallengeTask(title=title, bit=next_free_bit(challenge.tasks), position=position)
+    )
+
+    recompute_group_progress(challenge)
+    challenge.updated_at = datetime.utcnow()
+
+    db.commit()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
+
+    return format_challenge_response(challenge, user_id)
+
+
+@router.delete("/{challenge_id}/tasks/{task_id}", response_model=schemas.ChallengeResponse)
+def remove_task(challenge_id: int, task_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
+    challenge = _editable_challenge(db, challenge_id, user_id)
+
+    task = next((t for t in challenge.tasks if t.id == task_id), None)
+    if task is None:
+        raise HTTPException(404, "Task not found")
+
+    # clear the bit everywhere so it can be reused safely later
+    bit = 1 << task.bit
+    progress_map = {}
+    for user_key, value in (challenge.progress or {}).items():
+        mask = to_mask(value)
+        if mask & bit:
+            bump_score(db, int(user_key), tasks=-1)
+        progress_map[user_key] = mask & ~bit
+    challenge.progress = progress_map
+
+    challenge.tasks.remove(task)
+    recompute_group_progress(challenge)
+    challenge.updated_at = datetime.utcnow()
+
+    db.commit()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
+
+    return format_challenge_response(challenge, user_id)
+
+
+@router.put("/{challenge_id}/tasks/order", response_model=schemas.ChallengeResponse)
+def reorder_tasks(challenge_id: int, payload: schemas.ChallengeTaskOrder, user_id: int = Query(...), db: Session = Depends(get_db)):
+    challenge = _editable_challenge(db, challenge_id, user_id)
+
+    by_id = {t.id: t for t in challenge.tasks}
+    if sorted(payload.task_ids) != sorted(by_id):
+        raise HTTPException(400, "task_ids must list every task exactly once")
+
+    # only display positions move; bits (and so everyone's progress) stay put
+    for position, tid in enumerate(payload.task_ids):
+        by_id[tid].position = position
+    challenge.updated_at = datetime.utcnow()
+
+    db.commit()
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
+
+    return format_challenge_response(challenge, user_id)
+
+
+# ============================================================
+# Leaderboard
+# ============================================================
+def compute_leaderboard(db: Session, challenge: models.Challenge) -> List[dict]:
     progress = challenge.progress or {}
     participants = challenge.participants or []
 
-    all_tasks = sorted(challenge.tasks, key=lambda t: t.id)
-    total = len(all_tasks)
+    bits = task_bit_map(challenge.tasks)
+    total = len(bits)
+    all_mask = tasks_mask(bits)
+
+    names = dict(
+        db.query(models.User.id, models.User.name)
+        .filter(models.User.id.in_(participants))
+        .all()
+    ) if participants else {}
 
     leaderboard = []
 
     for uid in participants:
-        arr = progress.get(str(uid), [])
-        if len(arr) != total or total == 0:
+        if total == 0:
             pct = 0.0
         else:
-            vals = [1 if bool(x) else 0 for x in arr]
-            pct = round((sum(vals) / total) * 100, 2)
-
-        user = db.query(models.User).filter(models.User.id == uid).first()
-        name = user.name if user else f"User {uid}"
+            pct = round(done_count(progress.get(str(uid)), all_mask) / total * 100, 2)
 
         leaderboard.append({
             "user_id": uid,
-            "user_name": name,
+            "user_name": names.get(uid, f"User {uid}"),
             "progress": pct,
         })
 
@@ -330,27 +684,185 @@ def get_leaderboard(challenge_id: int, db: Session = Depends(get_db)):
     return leaderboard
 
 
+@router.get("/{challenge_id}/leaderboard")
+def get_leaderboard(challenge_id: int, db: Session = Depends(get_read_db)):
+    snapshot = db.get(
+        models.ChallengeSnapshot, challenge_id, options=[undefer(models.ChallengeSnapshot.leaderboard)]
+    )
+    if snapshot:
+        return snapshot.leaderboard
+
+    challenge = _load_challenge(db, challenge_id, *FULL_LOAD)
+    if not challenge:
+        raise HTTPException(404, "Challenge not found")
+
+    return compute_leaderboard(db, challenge)
+
+
+# ============================================================
+# Snapshots of ended challenges
+# ============================================================
+# still change after the end (comments stay open), so read from the live row
+LIVE_COUNTERS = (
+    models.Challenge.participants_count,
+    models.Challenge.comment_count,
+    models.Challenge.last_activity_at,
+)
+
+
+# one finalizer at a time, so workers do not all freeze (and then discard) the same batch
+_FINALIZER_LOCK_ID = 0x536E617073686F74  # "Snapshot"
+
+
+def format_snapshot_response(snapshot: models.ChallengeSnapshot, current_user_id: Optional[int], live=None):
+    """
+    Same shape as format_challenge_response, served from the frozen payload
+    plus the LIVE_COUNTERS values in `live` (a row), when given.
+    """
+    data = dict(snapshot.payload)
+    if live is not None:
+        data.update({column.key: getattr(live, column.key) for column in LIVE_COUNTERS})
+    participants = data.get("participants") or []
+
+    data["tasks"] = user_tasks(data.get("tasks") or [], data.get("progress") or {}, current_user_id)
+    data["is_creator"] = current_user_id is not None and data.get("creator_id") == current_user_id
+    data["is_joined"] = current_user_id is not None and current_user_id in participants
+    return data
+
+
+def list_challenge_views(db: Session, q, current_user_id: Optional[int], fields: tuple) -> List[dict]:
+    """
+    Responses for the challenges `q` (filtered / ordered / paged, no loader options)
+    selects. Ended challenges come from their snapshot plus LIVE_COUNTERS, so only the
+    others load tasks and progress from the live rows.
+    """
+    rows = q.with_entities(models.Challenge.id, *LIVE_COUNTERS).all()
+    if not rows:
+        return []
+    ids = [row.id for row in rows]
+
+    snapshots = {
+        s.challenge_id: s
+        for s in db.query(models.ChallengeSnapshot)
+        .options(undefer(models.ChallengeSnapshot.payload))
+        .filter(models.ChallengeSnapshot.challenge_id.in_(ids))
+    }
+    live_ids = [i for i in ids if i not in snapshots]
+    live = {}
+    if live_ids:
+        live = {
+            c.id: c
+            for c in db.query(models.Challenge)
+            .options(*challenge_load_options(fields, current_user_id))
+            .filter(models.Challenge.id.in_(live_ids))
+        }
+
+    out = []
+    for row in rows:
+        if row.id in snapshots:
+            data = format_snapshot_response(snapshots[row.id], current_user_id, row)
+            out.append({name: data[name] for name in fields if name in data})
+        elif row.id in live:
+            out.append(format_challenge_response(live[row.id], current_user_id, fields))
+    return out
+
+
+def _finalize_batch(db: Session, batch_size: int) -> Optional[int]:
+    """One batch of finalize_ended_challenges; None when another worker holds the lock."""
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _FINALIZER_LOCK_ID}).scalar()
+    if not locked:
+        return None
+
+    today = datetime.utcnow().date()
+    ended = (
+        db.query(models.Challenge)
+        .options(*FULL_LOAD)
+        .outerjoin(
+            models.ChallengeSnapshot,
+            models.ChallengeSnapshot.challenge_id == models.Challenge.id,
+        )
+        .filter(
+            models.Challenge.end_date < today,
+            models.ChallengeSnapshot.challenge_id.is_(None),
+        )
+        .order_by(models.Challenge.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not ended:
+        db.commit()
+        return 0
+
+    rows = []
+    for challenge in ended:
+        payload = jsonable_encoder(format_challenge_response(challenge, None))
+        rows.append({
+            "challenge_id": challenge.id,
+            "payload": payload,
+            "leaderboard": compute_leaderboard(db, challenge),
+            "group_progress": payload["group_progress"],
+            "participants_count": payload["participants_count"],
+            "tasks_count": len(payload["tasks"]),
+            "finalized_at": datetime.utcnow(),
+        })
+
+    db.execute(
+        pg_insert(models.ChallengeSnapshot)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["challenge_id"])
+    )
+    db.commit()
+    return len(rows)
+
+
+def finalize_ended_challenges(db: Session, batch_size: int = 100) -> int:
+    """
+    Freeze challenges whose end_date has passed into challenge_snapshots, batch by
+    batch until none are left. One worker finalizes at a time (the others skip the run);
+    existing snapshots are never rewritten. Returns the number of snapshots written.
+    """
+    total = 0
+    while True:
+        done = _finalize_batch(db, batch_size)
+        if done is None:
+            return total
+        total += done
+        if done < batch_size:
+            return total
+
+
 # ============================================================
 # Comments
 # ============================================================
 @router.get("/{challenge_id}/comments", response_model=List[schemas.CommentResponse])
-def get_comments(challenge_id: int, db: Session = Depends(get_db)):
+def get_comments(challenge_id: int, db: Session = Depends(get_read_db)):
     comments = db.query(models.Comment).filter(
         models.Comment.challenge_id == challenge_id
     ).order_by(models.Comment.timestamp.asc()).all()
     return comments
 
 
-@router.post("/{challenge_id}/comments", response_model=schemas.CommentResponse)
+@router.post(
+    "/{challenge_id}/comments",
+    response_model=schemas.CommentResponse,
+    dependencies=[Depends(rate_limit("comments", per_minute=20, burst=5))],
+)
 def add_comment(challenge_id: int, user_id: int = Query(...), content: str = Query(...), db: Session = Depends(get_db)):
     if not content.strip():
         raise HTTPException(400, "Empty comment")
 
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    challenge = _load_challenge(
+        db,
+        challenge_id,
+        load_only(models.Challenge.id),
+        noload(models.Challenge.tasks),
+        # membership straight from SQL: the participants blob is not needed here
+        with_expression(models.Challenge.viewer_joined, models.Challenge.participants.contains([user_id])),
+    )
     if not challenge:
         raise HTTPException(404, "Not found")
 
-    if user_id not in (challenge.participants or []):
+    if not challenge.viewer_joined:
         raise HTTPException(403, "Join first")
 
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -363,6 +875,9 @@ def add_comment(challenge_id: int, user_id: int = Query(...), content: str = Que
     )
 
     db.add(comment)
+    # SQL-side increment: concurrent comments cannot lose an update
+    challenge.comment_count = models.Challenge.comment_count + 1
+    challenge.last_activity_at = datetime.utcnow()
     db.commit()
     db.refresh(comment)
     return comment
@@ -389,6 +904,35 @@ def delete_comment(comment_id: int, user_id: int = Query(...), db: Session = Dep
     if not comment:
         raise HTTPException(404, "Comment not found")
 
+    db.query(models.Challenge).filter(models.Challenge.id == comment.challenge_id).update(
+        {models.Challenge.comment_count: func.greatest(models.Challenge.comment_count - 1, 0)},
+        synchronize_session=False,
+    )
     db.delete(comment)
     db.commit()
     return {"message": "Comment deleted"}
+
+
+def refresh_challenge_counters(db: Session) -> int:
+    """Recompute the denormalized counters from participants / comments (backfills, repairs)."""
+    comments = (
+        select(func.count(models.Comment.id))
+        .where(models.Comment.challenge_id == models.Challenge.id)
+        .scalar_subquery()
+    )
+    last_comment = (
+        select(func.max(models.Comment.timestamp))
+        .where(models.Comment.challenge_id == models.Challenge.id)
+        .scalar_subquery()
+    )
+    updated = db.query(models.Challenge).update(
+        {
+            models.Challenge.participants_count: func.jsonb_array_length(models.Challenge.participants),
+            models.Challenge.comment_count: comments,
+            # greatest() skips NULLs: challenges without comments fall back to updated_at
+            models.Challenge.last_activity_at: func.greatest(last_comment, models.Challenge.updated_at),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated
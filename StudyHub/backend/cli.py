@@ -0,0 +1,143 @@
+"""
+Maintenance commands, run from the StudyHub directory:
+
+    python -m backend.cli upgrade-schema
+    python -m backend.cli rebuild-scores
+    python -m backend.cli import-challenges challenges.csv [--dry-run]
+    python -m backend.cli rebuild-streaks [--user-id ID]
+    python -m backend.cli focus-partitions ensure|archive [--keep-months N]
+    python -m backend.cli challenge-counters
+    python -m backend.cli compact-focus-events
+    python -m backend.cli finalize-challenges [--batch-size N]
+"""
+import argparse
+import json
+from pathlib import Path
+
+from .challenge_import import import_challenges, parse_import_file
+from .challenges import finalize_ended_challenges, refresh_challenge_counters
+from .database import SessionLocal, engine
+from .focus_events import compact_focus_events
+from .partitions import archive_focus_partitions, ensure_focus_partitions
+from .ranking import rebuild_scores
+from .schema_upgrade import upgrade_schema
+from .streaks import rebuild_streaks
+
+
+def _upgrade_schema(args) -> None:
+    with engine.begin() as conn:
+        added = upgrade_schema(conn)
+    print("Added columns: " + (", ".join(added) or "nothing"))
+
+
+def _rebuild_scores(args) -> None:
+    db = SessionLocal()
+    try:
+        count = rebuild_scores(db)
+    finally:
+        db.close()
+    print(f"Rebuilt scores for {count} users")
+
+
+def _import_challenges(args) -> None:
+    path = Path(args.path)
+    rows = parse_import_file(path.name, path.read_bytes())
+    db = SessionLocal()
+    try:
+        report = import_challenges(db, rows, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+
+
+def _rebuild_streaks(args) -> None:
+    db = SessionLocal()
+    try:
+        count = rebuild_streaks(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"Rebuilt streaks for {count} users")
+
+
+def _focus_partitions(args) -> None:
+    db = SessionLocal()
+    try:
+        if args.action == "ensure":
+            print(f"Created {ensure_focus_partitions(db, months_ahead=args.months_ahead)} partitions")
+        else:
+            detached = archive_focus_partitions(db, keep_months=args.keep_months)
+            print("Detached: " + (", ".join(detached) or "nothing"))
+    finally:
+        db.close()
+
+
+def _challenge_counters(args) -> None:
+    db = SessionLocal()
+    try:
+        count = refresh_challenge_counters(db)
+    finally:
+        db.close()
+    print(f"Refreshed counters for {count} challenges")
+
+
+def _compact_focus_events(args) -> None:
+    db = SessionLocal()
+    try:
+        total = 0
+        while folded := compact_focus_events(db):
+            total += folded
+    finally:
+        db.close()
+    print(f"Folded {total} focus events")
+
+
+def _finalize_challenges(args) -> None:
+    db = SessionLocal()
+    try:
+        count = finalize_ended_challenges(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Finalized {count} challenges")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="backend.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser("upgrade-schema", help="add columns and indexes missing from existing tables")
+    upgrade.set_defaults(func=_upgrade_schema)
+
+    rebuild = commands.add_parser("rebuild-scores", help="recompute the global ranking table")
+    rebuild.set_defaults(func=_rebuild_scores)
+
+    importer = commands.add_parser("import-challenges", help="bulk create challenges from JSON or CSV")
+    importer.add_argument("path")
+    importer.add_argument("--dry-run", action="store_true", help="validate only, insert nothing")
+    importer.set_defaults(func=_import_challenges)
+
+    streaks = commands.add_parser("rebuild-streaks", help="recompute study streaks from history")
+    streaks.add_argument("--user-id", type=int, default=None)
+    streaks.set_defaults(func=_rebuild_streaks)
+
+    partitions = commands.add_parser("focus-partitions", help="manage monthly focus_sessions partitions")
+    partitions.add_argument("action", choices=["ensure", "archive"])
+    partitions.add_argument("--months-ahead", type=int, default=2)
+    partitions.add_argument("--keep-months", type=int, default=12)
+    partitions.set_defaults(func=_focus_partitions)
+
+    counters = commands.add_parser("challenge-counters", help="recompute participant/comment counters")
+    counters.set_defaults(func=_challenge_counters)
+
+    compact = commands.add_parser("compact-focus-events", help="fold all pending focus events now")
+    compact.set_defaults(func=_compact_focus_events)
+
+    finalize = commands.add_parser("finalize-challenges", help="snapshot every ended challenge now")
+    finalize.add_argument("--batch-size", type=int, default=100)
+    finalize.set_defaults(func=_finalize_challenges)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+
+from fastapi import Request
+
+# Proxies (e.g. the load balancer) whose X-Forwarded-For is trusted, comma separated; "*" trusts
+# whichever peer connects. Without it request.client is the proxy, so every caller shares one key.
+# (Running uvicorn with --proxy-headers --forwarded-allow-ips=<proxy> rewrites request.client instead.)
+TRUSTED_PROXIES = {p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()}
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address: the peer itself, or what a trusted proxy says it forwarded for."""
+    peer = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXIES or ("*" not in TRUSTED_PROXIES and peer not in TRUSTED_PROXIES):
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    # walk back from the hop our own proxy appended; anything left of the client is spoofable
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return hops[0] if hops else peer
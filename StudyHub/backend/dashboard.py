@@ -0,0 +1,48 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .challenges import DASHBOARD_CARD_FIELDS, challenge_card, challenge_load_options
+from .database import get_read_db
+from .focusTime import _today_bounds, current_session, summarize_day
+from .models import Challenge, Goal
+from .schemas import DashboardResponse
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+# ---------- endpoints ----------
+@router.get("", response_model=DashboardResponse)
+def get_dashboard(user_id: int = Query(..., gt=0), db: Session = Depends(get_read_db)):
+    """
+    Everything the dashboard shows on load, from one session and one connection
+    checkout instead of a request (and checkout) per widget.
+    """
+    today = date.today().isoformat()
+    start, end = _today_bounds()
+
+    goals = (
+        db.query(Goal)
+        .filter(Goal.user_id == user_id, Goal.date == today)
+        .order_by(Goal.id)
+        .all()
+    )
+
+    # joined and not yet ended (participants @> [user_id] hits the GIN index)
+    challenges = (
+        db.query(Challenge)
+        .options(*challenge_load_options(DASHBOARD_CARD_FIELDS, user_id))
+        .filter(Challenge.participants.contains([user_id]), Challenge.end_date >= date.today())
+        .order_by(Challenge.end_date, Challenge.id)
+        .all()
+    )
+
+    return {
+        "user_id": user_id,
+        "date": today,
+        "goals": goals,
+        "focus": summarize_day(db, user_id, start, end, today),
+        "active_session": current_session(db, user_id),
+        "challenges": [challenge_card(c, user_id) for c in challenges],
+    }
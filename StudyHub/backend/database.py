@@ -1,8 +1,23 @@
+import itertools
+import logging
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from .clientinfo import client_ip
+
+try:  # optional: read-your-writes pins shared across workers (pip install redis)
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
 
+logger = logging.getLogger(__name__)
 
 # Load database URL from Render Environment Variable
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -10,8 +25,22 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is missing")
 
+# Optional read replicas, comma separated
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# After a user writes, their reads stay on the primary for this long
+READ_YOUR_WRITES_SEC = float(os.getenv("READ_YOUR_WRITES_SEC", "5"))
+# Replicas further behind than this (or not yet measured) get no reads
+REPLICA_MAX_LAG_SEC = float(os.getenv("REPLICA_MAX_LAG_SEC", "10"))
+# Where those pins live. Without Redis they are per process, and with several workers a
+# read can land on one that never saw the write; defaults to the rate limiter's Redis.
+PINS_REDIS_URL = os.getenv("READ_YOUR_WRITES_REDIS_URL") or os.getenv("RATE_LIMIT_REDIS_URL")
+
 # Create engine with SSL mode for Supabase
 engine = create_engine(DATABASE_URL, connect_args={"sslmode": "require"})
+replica_engines = [
+    create_engine(url, connect_args={"sslmode": "require"}, pool_pre_ping=True)
+    for url in REPLICA_URLS
+]
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,9 +49,168 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# ============================================================
+# Read-your-writes tracking
+# ============================================================
+class MemoryPins:
+    """Per-process pins: key -> monotonic deadline."""
+
+    def __init__(self, max_keys: int = 10_000):
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def pin(self, keys: List[str], ttl: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                self._until[key] = now + ttl
+            # drop expired pins so the map stays small
+            if len(self._until) > self._max_keys:
+                for key in [k for k, until in self._until.items() if until < now]:
+                    del self._until[key]
+
+    def pinned(self, keys: List[str]) -> bool:
+        now = time.monotonic()
+        return any(self._until.get(key, 0) > now for key in keys)
+
+
+class RedisPins:
+    """Pins as expiring Redis keys, seen by every worker. Fails closed: reads go to the primary."""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+
+    def pin(self, keys: List[str], ttl: float) -> None:
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(f"ryw:{key}", 1, px=max(1, int(ttl * 1000)))
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Read-your-writes store unavailable, pin lost", exc_info=True)
+
+    def pinned(self, keys: List[str]) -> bool:
+        try:
+            return self._client.exists(*(f"ryw:{key}" for key in keys)) > 0
+        except redis.RedisError:
+            logger.warning("Read-your-writes store unavailable, reading from the primary", exc_info=True)
+            return True
+
+
+def _make_pins():
+    if PINS_REDIS_URL and redis is not None:
+        return RedisPins(PINS_REDIS_URL)
+    if PINS_REDIS_URL:
+        logger.warning("Read-your-writes Redis URL set but redis is not installed; pins are per process")
+    return MemoryPins()
+
+
+_pins = _make_pins()
+
+
+def request_keys(request: Request) -> List[str]:
+    """
+    Who is asking. The API has no auth, so use any user id the route carries (query or
+    path), or else the client IP; writes pin all of them, reads check any of them.
+    """
+    keys = []
+    for name in ("user_id", "current_user_id"):
+        user_id = request.query_params.get(name) or request.path_params.get(name)
+        if user_id:
+            keys.append(f"user:{user_id}")
+    # the IP only as a fallback: behind NAT or a proxy it is shared, and one user's
+    # write would keep everyone's reads off the replicas
+    return keys or [f"ip:{client_ip(request)}"]
+
+
+def pin_user(db: Session, user_id: Optional[int]) -> None:
+    """
+    For writes whose user id is in the body or the row rather than the URL: pin that user
+    too when the session commits (mark_write via the after_commit hook below).
+    """
+    if user_id is None or "request_keys" not in db.info:
+        return
+    keys = [k for k in db.info["request_keys"] if not k.startswith("ip:")]
+    db.info["request_keys"] = keys + [f"user:{user_id}"]
+
+
+def mark_write(keys: List[str]) -> None:
+    _pins.pin(keys, READ_YOUR_WRITES_SEC)
+
+
+def _pinned_to_primary(keys: List[str]) -> bool:
+    return bool(keys) and _pins.pinned(keys)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _remember_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _remember_dml(orm_execute_state):
+    # bulk insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _pin_writer(session):
+    if session.info.pop("wrote", False) and session.info.get("request_keys"):
+        mark_write(session.info["request_keys"])
+
+
+# ============================================================
+# Replica selection and lag
+# ============================================================
+replica_lag: Dict[int, Optional[float]] = {i: None for i in range(len(replica_engines))}
+_round_robin = itertools.count()
+
+
+def refresh_replica_lag(db: Optional[Session] = None) -> None:
+    """Measure replay lag on every replica (seconds, 0 when fully caught up)."""
+    for i, replica in enumerate(replica_engines):
+        try:
+            with replica.connect() as conn:
+                replica_lag[i] = float(conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )).scalar())
+        except Exception:
+            logger.warning("Replica %d lag check failed", i, exc_info=True)
+            replica_lag[i] = None
+
+
+def _healthy_replicas() -> List[int]:
+    return [
+        i for i, lag in replica_lag.items()
+        if lag is not None and lag <= REPLICA_MAX_LAG_SEC
+    ]
+
+
+def read_session(keys: Optional[List[str]] = None) -> Session:
+    """Session on a healthy replica, or on the primary when none qualifies."""
+    healthy = _healthy_replicas()
+    if not healthy or _pinned_to_primary(keys or []):
+        return SessionLocal()
+    replica = replica_engines[healthy[next(_round_robin) % len(healthy)]]
+    return SessionLocal(bind=replica)
+
+
 # Database dependency
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["request_keys"] = request_keys(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Read-only database dependency (GET routes)
+def get_read_db(request: Request):
+    db = read_session(request_keys(request))
     try:
         yield db
     finally:
@@ -0,0 +1,153 @@
+import csv
+import enum
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Iterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from .database import read_session, request_keys
+from .models import Challenge, ChallengeTask, Comment, FocusSession, Goal
+from .profiler import require_admin
+from .task_bits import ordered_tasks, progress_array, task_bit_map
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+BATCH_ROWS = 500
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# dataset -> (table, user id column, order column)
+_TABLES = {
+    "focus_sessions": (FocusSession.__table__, FocusSession.user_id, FocusSession.id),
+    "goals": (Goal.__table__, Goal.user_id, Goal.id),
+    "comments": (Comment.__table__, Comment.user_id, Comment.id),
+}
+CHALLENGE_PROGRESS_COLUMNS = ["challenge_id", "user_id", "tasks_total", "tasks_done", "progress"]
+DATASETS = [*_TABLES, "challenge_progress"]
+
+
+# ---------- row sources ----------
+def _table_rows(db, dataset: str, user_id: int | None) -> Iterator[dict]:
+    table, user_col, order_col = _TABLES[dataset]
+    stmt = select(table).order_by(order_col)
+    if user_id is not None:
+        stmt = stmt.where(user_col == user_id)
+    # server-side cursor: rows are fetched BATCH_ROWS at a time, never all at once
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=BATCH_ROWS))
+    for row in result.mappings():
+        yield dict(row)
+
+
+def _challenge_progress_rows(db, user_id: int | None) -> Iterator[dict]:
+    # tasks ride along with their challenge row, so bit -> display order needs no extra query
+    tasks = (
+        select(func.json_agg(func.json_build_object(
+            "id", ChallengeTask.id, "bit", ChallengeTask.bit, "position", ChallengeTask.position,
+        )))
+        .where(ChallengeTask.challenge_id == Challenge.id)
+        .scalar_subquery()
+    )
+    stmt = select(Challenge.id, Challenge.progress, tasks).order_by(Challenge.id)
+    if user_id is not None:
+        stmt = stmt.where(Challenge.participants.contains([user_id]))
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=BATCH_ROWS))
+    for challenge_id, progress, task_rows in result:
+        ordered = ordered_tasks(SimpleNamespace(**t) for t in task_rows or [])
+        bits = task_bit_map(ordered)
+        for key, value in (progress or {}).items():
+            if user_id is not None and key != str(user_id):
+                continue
+            arr = progress_array(value, ordered, bits)
+            yield {
+                "challenge_id": challenge_id,
+                "user_id": int(key),
+                "tasks_total": len(arr),
+                "tasks_done": sum(1 for x in arr if x),
+                "progress": arr,
+            }
+
+
+def _columns(dataset: str) -> list[str]:
+    if dataset == "challenge_progress":
+        return CHALLENGE_PROGRESS_COLUMNS
+    return [c.name for c in _TABLES[dataset][0].columns]
+
+
+# ---------- encoders ----------
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class _Echo:
+    """File-like object for csv.writer that hands the formatted line back."""
+
+    def write(self, value):
+        return value
+
+
+def _encode(rows: Iterator[dict], columns: list[str], fmt: ExportFormat) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    chunk: list[str] = []
+    if fmt == "csv":
+        chunk.append(writer.writerow(columns))
+
+    for row in rows:
+        if fmt == "csv":
+            values = [_plain(row.get(c)) for c in columns]
+            values = [json.dumps(v) if isinstance(v, (list, dict)) else v for v in values]
+            chunk.append(writer.writerow(values))
+        else:
+            chunk.append(json.dumps({c: _plain(row.get(c)) for c in columns}) + "\n")
+
+        if len(chunk) >= BATCH_ROWS:
+            yield "".join(chunk)
+            chunk = []
+
+    if chunk:
+        yield "".join(chunk)
+
+
+def _stream(request: Request, dataset: str, user_id: int | None, fmt: ExportFormat) -> StreamingResponse:
+    if dataset not in DATASETS:
+        raise HTTPException(404, f"Unknown dataset. Available: {', '.join(DATASETS)}")
+    keys = request_keys(request)
+
+    def body():
+        # own session: it has to stay open for as long as the response streams
+        db = read_session(keys)
+        try:
+            if dataset == "challenge_progress":
+                rows = _challenge_progress_rows(db, user_id)
+            else:
+                rows = _table_rows(db, dataset, user_id)
+            yield from _encode(rows, _columns(dataset), fmt)
+        finally:
+            db.close()
+
+    suffix = f"_user{user_id}" if user_id is not None else ""
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}{suffix}.{fmt}"'},
+    )
+
+
+# ---------- endpoints ----------
+@router.get("/users/{user_id}/{dataset}")
+def export_user_dataset(user_id: int, dataset: str, request: Request, format: ExportFormat = Query("ndjson")):
+    return _stream(request, dataset, user_id, format)
+
+
+# every user's rows: admin only (X-Admin-Token)
+@router.get("/{dataset}", dependencies=[Depends(require_admin)])
+def export_dataset(dataset: str, request: Request, format: ExportFormat = Query("ndjson")):
+    return _stream(request, dataset, None, format)
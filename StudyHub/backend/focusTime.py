@@ -1,51 +1,164 @@
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, Query
+import os
+from datetime import datetime, date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 
-from .database import get_db
-from .models import FocusSession, SessionStatus
-from .schemas import FocusCreate, FocusResponse, FocusTick, FocusSummary
+from .conditional import make_etag, not_modified
+from .database import get_db, get_read_db, pin_user
+from .focus_events import pending_events, pending_session_ids, project, project_all, record_event
+from .models import FocusDailyStat, FocusEvent, FocusEventKind, FocusSession, SessionStatus
+from .ranking import bump_score
+from .ratelimit import rate_limit
+from .schemas import FocusCreate, FocusDailyStats, FocusResponse, FocusTick, FocusSummary
+from .streaks import record_activity
 
 router = APIRouter(prefix="/focus", tags=["Focus Timer"])
 
+# running/paused sessions untouched for duration_min + grace are treated as abandoned
+STALE_GRACE_MIN = int(os.getenv("FOCUS_STALE_GRACE_MIN", "30"))
+# rows /focus/status projects at most (newest first)
+STATUS_CANDIDATES = int(os.getenv("FOCUS_STATUS_CANDIDATES", "20"))
+
 
 # ---------- helpers ----------
-def _cap(v: float, lo: float, hi: float) -> float:
-    return min(max(v, lo), hi)
+def _today_bounds():
+    now = datetime.utcnow()
+    start = datetime.combine(date.today(), datetime.min.time())
+    end = datetime.combine(date.today(), datetime.max.time())
+    return start, end
 
 
-def _compute_growth(
-    duration_min: int, elapsed_sec: float, did_pause: bool, status: SessionStatus
-) -> float:
+def _session_state(db: Session, sid: int) -> dict:
     """
-    plant growth logic (4 levels):
-    - 0.0: Incomplete / abandoned session
-    - 0.33: Session completed but with multiple pauses/breaks
-    - 0.66: Session completed with 1 short pause
-    - 1.0: Session completed fully with no pauses
+    Current state of one session: its row plus events the compactor has not folded yet.
+    The row stays locked until the caller commits, so concurrent timer actions (and the
+    sweeper) act on the state this one leaves behind, not on the same snapshot.
     """
-    if status != SessionStatus.completed:
-        return 0.0
-
-    full_required = duration_min * 60
-    if elapsed_sec + 0.5 < full_required * 0.7:
-        return 0.0
-
-    if not did_pause:
-        return 1.0
-    elif did_pause and elapsed_sec >= full_required * 0.9:
-        return 0.66
-    elif did_pause and elapsed_sec >= full_required * 0.6:
-        return 0.33
+    sess = db.query(FocusSession).filter(FocusSession.id == sid).with_for_update().first()
+    if not sess:
+        raise HTTPException(404, "Session not found")
+    pin_user(db, sess.user_id)
+    return project(sess, pending_events(db, [sid]).get(sid, ()))
+
+
+def sweep_stale_sessions(db: Session, grace_min: int = STALE_GRACE_MIN) -> int:
+    """Cancel sessions left running/paused (e.g. tab closed) long past their planned length."""
+    last_seen = func.coalesce(FocusSession.updated_at, FocusSession.started_at, FocusSession.created_at)
+    # make_interval(years, months, weeks, days, hours, mins)
+    expires_at = last_seen + func.make_interval(0, 0, 0, 0, 0, FocusSession.duration_min + grace_min)
+    stale_ids = [
+        sid for (sid,) in (
+            db.query(FocusSession.id)
+            .filter(
+                FocusSession.status.in_([SessionStatus.running, SessionStatus.paused]),
+                expires_at < datetime.utcnow(),
+            )
+            # a timer action holding the row wins; the next sweep looks again
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+    ]
+    if not stale_ids:
+        db.commit()
+        return 0
+
+    swept = (
+        db.query(FocusSession)
+        .filter(
+            FocusSession.id.in_(stale_ids),
+            # checked under the lock, so an event committed just before is seen here;
+            # rows with unfolded events are stale on paper only
+            FocusSession.id.not_in(pending_session_ids()),
+        )
+        .update(
+            {
+                FocusSession.status: SessionStatus.canceled,
+                FocusSession.plant_growth: 0.0,
+                FocusSession.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return swept
+
+
+def summarize_day(db: Session, user_id: int | None, start: datetime, end: datetime, label: str) -> FocusSummary:
+    q = db.query(FocusSession).filter(
+        or_(
+            FocusSession.started_at.between(start, end),
+            # started, but the start event is not folded into the row yet
+            FocusSession.id.in_(pending_session_ids(user_id, FocusEventKind.start)),
+        ),
+        # a session is created before it starts: lets Postgres prune later partitions
+        FocusSession.created_at <= end,
+    )
+    if user_id is not None:
+        q = q.filter(FocusSession.user_id == user_id)
+    sessions = [
+        s for s in project_all(db, q.all())
+        if s["started_at"] is not None and start <= s["started_at"] <= end
+    ]
+
+    if not sessions:
+        return FocusSummary(
+            date=label,
+            total_elapsed_sec=0,
+            active_timer=None,
+            daily_plant_growth=0.0,
+        )
+
+    total_elapsed = sum(s["elapsed_sec"] for s in sessions)
+
+    completed_sessions = [s for s in sessions if s["status"] == SessionStatus.completed]
+    if completed_sessions:
+        daily_growth = sum(s["plant_growth"] for s in completed_sessions) / len(
+            completed_sessions
+        )
     else:
-        return 0.0
+        daily_growth = 0.0
 
+    # active timer (remaining) from most recent running session
+    running = [s for s in sessions if s["status"] == SessionStatus.running]
+    active_remaining = None
+    if running:
+        latest = sorted(
+            running, key=lambda s: s["updated_at"] or s["started_at"] or datetime.min
+        )[-1]
+        active_remaining = int(max(0, latest["duration_min"] * 60 - latest["elapsed_sec"]))
 
-def _today_bounds():
-    now = datetime.utcnow()
-    start = datetime.combine(date.today(), datetime.min.time())
-    end = datetime.combine(date.today(), datetime.max.time())
-    return start, end
+    return FocusSummary(
+        date=label,
+        total_elapsed_sec=total_elapsed,
+        active_timer=active_remaining,
+        daily_plant_growth=daily_growth,
+    )
+
+
+def open_sessions(db: Session, user_id: int | None = None) -> list[dict]:
+    """Running / paused sessions, taking unfolded events into account."""
+    q = db.query(FocusSession).filter(
+        or_(
+            FocusSession.status.in_([SessionStatus.running, SessionStatus.paused]),
+            FocusSession.id.in_(pending_session_ids(user_id)),
+        )
+    )
+    if user_id is not None:
+        q = q.filter(FocusSession.user_id == user_id)
+    return [
+        s for s in project_all(db, q.order_by(FocusSession.id).all())
+        if s["status"] in (SessionStatus.running, SessionStatus.paused)
+    ]
+
+
+def current_session(db: Session, user_id: int) -> dict | None:
+    """The user's latest running or paused session, whatever day it started."""
+    return max(
+        open_sessions(db, user_id),
+        key=lambda s: (s["updated_at"] or datetime.min, s["id"]),
+        default=None,
+    )
 
 
 # ---------- endpoints ----------
@@ -55,90 +168,98 @@ def create_session(payload: FocusCreate, db: Session = Depends(get_db)):
         title=payload.title, duration_min=payload.duration_min, user_id=payload.user_id
     )
     db.add(sess)
+    pin_user(db, payload.user_id)
     db.commit()
     db.refresh(sess)
     return sess
 
 
+# Timer actions only append to focus_events; the compactor folds them into the row.
 @router.post("/sessions/{sid}/start", response_model=FocusResponse)
 def start_session(sid: int, db: Session = Depends(get_db)):
-    sess = db.get(FocusSession, sid)
-    if not sess:
-        raise HTTPException(404, "Session not found")
-    if sess.status not in (SessionStatus.created, SessionStatus.paused):
-        raise HTTPException(409, f"Cannot start from status {sess.status}")
-    if sess.status == SessionStatus.created:
-        sess.started_at = datetime.utcnow()
-    sess.status = SessionStatus.running
+    state = _session_state(db, sid)
+    if state["status"] not in (SessionStatus.created, SessionStatus.paused):
+        raise HTTPException(409, f"Cannot start from status {state['status']}")
+    record_event(db, state, FocusEventKind.start)
     db.commit()
-    db.refresh(sess)
-    return sess
+    return state
 
 
 @router.post("/sessions/{sid}/pause", response_model=FocusResponse)
 def pause_session(sid: int, tick: FocusTick, db: Session = Depends(get_db)):
-    sess = db.get(FocusSession, sid)
-    if not sess:
-        raise HTTPException(404, "Session not found")
-    if sess.status != SessionStatus.running:
+    state = _session_state(db, sid)
+    if state["status"] != SessionStatus.running:
         raise HTTPException(409, "Only running sessions can be paused")
-    max_sec = sess.duration_min * 60
-    sess.elapsed_sec = _cap(tick.elapsed_sec, 0, max_sec)
-    sess.pauses_count += 1
-    sess.did_pause = True
-    sess.status = SessionStatus.paused
+    record_event(db, state, FocusEventKind.pause, tick.elapsed_sec)
     db.commit()
-    db.refresh(sess)
-    return sess
+    return state
 
 
 @router.post("/sessions/{sid}/resume", response_model=FocusResponse)
 def resume_session(sid: int, db: Session = Depends(get_db)):
-    sess = db.get(FocusSession, sid)
-    if not sess:
-        raise HTTPException(404, "Session not found")
-    if sess.status != SessionStatus.paused:
+    state = _session_state(db, sid)
+    if state["status"] != SessionStatus.paused:
         raise HTTPException(409, "Only paused sessions can be resumed")
-    sess.status = SessionStatus.running
+    record_event(db, state, FocusEventKind.resume)
     db.commit()
-    db.refresh(sess)
-    return sess
+    return state
 
 
 @router.post("/sessions/{sid}/complete", response_model=FocusResponse)
 def complete_session(sid: int, tick: FocusTick, db: Session = Depends(get_db)):
-    sess = db.get(FocusSession, sid)
-    if not sess:
-        raise HTTPException(404, "Session not found")
-    if sess.status not in (SessionStatus.running, SessionStatus.paused):
+    state = _session_state(db, sid)
+    if state["status"] not in (SessionStatus.running, SessionStatus.paused):
         raise HTTPException(409, "Only running/paused sessions can be completed")
-    max_sec = sess.duration_min * 60
-    sess.elapsed_sec = _cap(tick.elapsed_sec, 0, max_sec)
-    sess.status = SessionStatus.completed
-    sess.completed_at = datetime.utcnow()
-    sess.plant_growth = _compute_growth(
-        sess.duration_min, sess.elapsed_sec, sess.did_pause, sess.status
+    # growth is evaluated from the folded event stream
+    record_event(db, state, FocusEventKind.complete, tick.elapsed_sec)
+    bump_score(
+        db,
+        state["user_id"],
+        focus_minutes=state["elapsed_sec"] / 60,
+        plant_growth=state["plant_growth"],
     )
+    record_activity(db, state["user_id"], state["completed_at"].date())
     db.commit()
-    db.refresh(sess)
-    return sess
+    return state
 
 
 @router.get("/sessions", response_model=list[FocusResponse])
-def list_sessions(user_id: int | None = None, db: Session = Depends(get_db)):
+def list_sessions(
+    request: Request,
+    response: Response,
+    user_id: int | None = None,
+    db: Session = Depends(get_read_db),
+):
+    version = db.query(func.max(FocusSession.updated_at), func.count(FocusSession.id))
+    latest_event = db.query(func.max(FocusEvent.id), func.max(FocusEvent.at))
+    if user_id is not None:
+        version = version.filter(FocusSession.user_id == user_id)
+        latest_event = latest_event.filter(FocusEvent.user_id == user_id)
+    last_updated, count = version.one()
+    event_id, event_at = latest_event.one()
+    etag = make_etag("sessions", user_id, last_updated, count, event_id)
+    # timer actions only append events until the compactor touches the row
+    last_modified = max(filter(None, (last_updated, event_at)), default=None)
+    cached = not_modified(request, response, etag, last_modified)
+    if cached:
+        return cached
+
     q = db.query(FocusSession)
     if user_id is not None:
         q = q.filter(FocusSession.user_id == user_id)
-    return q.order_by(
-        FocusSession.started_at.desc().nullslast(), FocusSession.id.desc()
-    ).all()
+    # ordered after projection: a pending start event changes started_at
+    return sorted(
+        project_all(db, q.all()),
+        key=lambda s: (s["started_at"] is not None, s["started_at"] or datetime.min, s["id"]),
+        reverse=True,
+    )
 
 
 @router.get("/summary", response_model=FocusSummary)
 def daily_summary(
     user_id: int | None = None,
     day: str | None = Query(None, description="YYYY-MM-DD (UTC). Defaults to today."),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     if day:
         y, m, d = map(int, day.split("-"))
@@ -147,57 +268,42 @@ def daily_summary(
     else:
         start, end = _today_bounds()
 
-    q = db.query(FocusSession).filter(
-        FocusSession.started_at >= start, FocusSession.started_at <= end
-    )
-    if user_id is not None:
-        q = q.filter(FocusSession.user_id == user_id)
-    sessions = q.all()
-
-    if not sessions:
-        return FocusSummary(
-            date=(day or date.today().isoformat()),
-            total_elapsed_sec=0,
-            active_timer=None,
-            daily_plant_growth=0.0,
-        )
-
-    total_elapsed = sum(s.elapsed_sec for s in sessions)
-
-    completed_sessions = [s for s in sessions if s.status == SessionStatus.completed]
-    if completed_sessions:
-        daily_growth = sum(s.plant_growth for s in completed_sessions) / len(
-            completed_sessions
-        )
-    else:
-        daily_growth = 0.0
+    return summarize_day(db, user_id, start, end, day or date.today().isoformat())
 
-    # active timer (remaining) from most recent running session
-    running = [s for s in sessions if s.status == SessionStatus.running]
-    active_remaining = None
-    if running:
-        latest = sorted(
-            running, key=lambda s: s.updated_at or s.started_at or datetime.min
-        )[-1]
-        active_remaining = int(max(0, latest.duration_min * 60 - latest.elapsed_sec))
 
-    return FocusSummary(
-        date=(day or date.today().isoformat()),
-        total_elapsed_sec=total_elapsed,
-        active_timer=active_remaining,
-        daily_plant_growth=daily_growth,
+@router.get("/stats", response_model=list[FocusDailyStats])
+def daily_stats(
+    user_id: int,
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_read_db),
+):
+    """Per-day totals (focus, pause time, pauses, growth) kept up to date by the compactor."""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return (
+        db.query(FocusDailyStat)
+        .filter(FocusDailyStat.user_id == user_id, FocusDailyStat.day >= since)
+        .order_by(FocusDailyStat.day)
+        .all()
     )
 
 
-@router.get("/status")
-def get_focus_status(db: Session = Depends(get_db)):
-
-    active = (
-        db.query(FocusSession)
-        .filter(FocusSession.status == SessionStatus.running)
-        .first()
+@router.get("/status", dependencies=[Depends(rate_limit("focus-status", per_minute=120, burst=30))])
+def get_focus_status(user_id: int | None = None, db: Session = Depends(get_read_db)):
+    # polled constantly: only running rows and rows with unfolded events are read (both
+    # indexed and few), projected with those events so a start or resume counts at once
+    q = db.query(FocusSession).filter(
+        or_(
+            FocusSession.status == SessionStatus.running,
+            FocusSession.id.in_(pending_session_ids(user_id)),
+        )
     )
+    if user_id is not None:
+        q = q.filter(FocusSession.user_id == user_id)
+    candidates = q.order_by(FocusSession.id.desc()).limit(STATUS_CANDIDATES).all()
+
+    # the newest session that is running once its events are applied
+    active = next((s for s in project_all(db, candidates) if s["status"] == SessionStatus.running), None)
     if active:
-        remaining = int(max(0, active.duration_min * 60 - active.elapsed_sec))
+        remaining = int(max(0, active["duration_min"] * 60 - active["elapsed_sec"]))
         return {"active": True, "remaining": remaining}
     return {"active": False}
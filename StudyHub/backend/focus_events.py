@@ -0,0 +1,242 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .models import FocusDailyStat, FocusEvent, FocusEventKind, FocusSession, SessionStatus
+
+FOCUS_COMPACT_BATCH = int(os.getenv("FOCUS_COMPACT_BATCH", "1000"))
+
+# one compactor at a time across workers, so a session's events are folded in order
+_COMPACTOR_LOCK_ID = 0x466F637573  # "Focus"
+
+# session columns that timer events can change, plus what the API returns
+STATE_FIELDS = (
+    "id", "user_id", "title", "duration_min", "elapsed_sec", "pauses_count", "did_pause",
+    "pause_sec", "paused_at", "status", "started_at", "completed_at", "updated_at", "plant_growth",
+)
+
+
+# ---------- growth ----------
+def _cap(v: float, lo: float, hi: float) -> float:
+    return min(max(v, lo), hi)
+
+
+def _compute_growth(
+    duration_min: int, elapsed_sec: float, did_pause: bool, status: SessionStatus
+) -> float:
+    """
+    plant growth logic (4 levels):
+    - 0.0: Incomplete / abandoned session
+    - 0.33: Session completed but with multiple pauses/breaks
+    - 0.66: Session completed with 1 short pause
+    - 1.0: Session completed fully with no pauses
+    """
+    if status != SessionStatus.completed:
+        return 0.0
+
+    full_required = duration_min * 60
+    if elapsed_sec + 0.5 < full_required * 0.7:
+        return 0.0
+
+    if not did_pause:
+        return 1.0
+    elif did_pause and elapsed_sec >= full_required * 0.9:
+        return 0.66
+    elif did_pause and elapsed_sec >= full_required * 0.6:
+        return 0.33
+    else:
+        return 0.0
+
+
+# ---------- folding ----------
+def _end_pause(state: dict, at: datetime) -> None:
+    if state["paused_at"] is not None:
+        state["pause_sec"] += max(0.0, (at - state["paused_at"]).total_seconds())
+    state["paused_at"] = None
+
+
+def apply_event(state: dict, kind: FocusEventKind, at: datetime, elapsed_sec: Optional[float] = None) -> bool:
+    """
+    Fold one event into a session state dict. Returns False (state untouched) when the
+    transition is not allowed, so duplicate or racing events replay harmlessly.
+    """
+    status = state["status"]
+    max_sec = state["duration_min"] * 60
+
+    if kind == FocusEventKind.start:
+        if status == SessionStatus.created:
+            state["started_at"] = at
+        elif status == SessionStatus.paused:
+            _end_pause(state, at)
+        else:
+            return False
+        state["status"] = SessionStatus.running
+
+    elif kind == FocusEventKind.pause:
+        if status != SessionStatus.running:
+            return False
+        state["elapsed_sec"] = _cap(elapsed_sec or 0.0, 0, max_sec)
+        state["pauses_count"] += 1
+        state["did_pause"] = True
+        state["paused_at"] = at
+        state["status"] = SessionStatus.paused
+
+    elif kind == FocusEventKind.resume:
+        if status != SessionStatus.paused:
+            return False
+        _end_pause(state, at)
+        state["status"] = SessionStatus.running
+
+    elif kind == FocusEventKind.complete:
+        if status not in (SessionStatus.running, SessionStatus.paused):
+            return False
+        _end_pause(state, at)
+        state["elapsed_sec"] = _cap(elapsed_sec or 0.0, 0, max_sec)
+        state["status"] = SessionStatus.completed
+        state["completed_at"] = at
+        state["plant_growth"] = _compute_growth(
+            state["duration_min"], state["elapsed_sec"], state["did_pause"], state["status"]
+        )
+
+    state["updated_at"] = at
+    return True
+
+
+def project(sess: FocusSession, events: Iterable[FocusEvent] = ()) -> dict:
+    """Session row + its not-yet-compacted events -> current state (nothing is written)."""
+    state = {field: getattr(sess, field) for field in STATE_FIELDS}
+    state["elapsed_sec"] = state["elapsed_sec"] or 0.0
+    state["pauses_count"] = state["pauses_count"] or 0
+    state["did_pause"] = bool(state["did_pause"])
+    state["pause_sec"] = state["pause_sec"] or 0.0
+    state["plant_growth"] = state["plant_growth"] or 0.0
+    for event in events:
+        apply_event(state, event.kind, event.at, event.elapsed_sec)
+    return state
+
+
+def pending_events(db: Session, session_ids: List[int]) -> Dict[int, List[FocusEvent]]:
+    if not session_ids:
+        return {}
+    events = (
+        db.query(FocusEvent)
+        .filter(FocusEvent.session_id.in_(session_ids), FocusEvent.compacted.is_(False))
+        .order_by(FocusEvent.id)
+        .all()
+    )
+    grouped: Dict[int, List[FocusEvent]] = defaultdict(list)
+    for event in events:
+        grouped[event.session_id].append(event)
+    return grouped
+
+
+def project_all(db: Session, sessions: List[FocusSession]) -> List[dict]:
+    pending = pending_events(db, [s.id for s in sessions])
+    return [project(s, pending.get(s.id, ())) for s in sessions]
+
+
+def pending_session_ids(user_id: Optional[int] = None, kind: Optional[FocusEventKind] = None):
+    """Subquery of sessions with events the compactor has not folded yet."""
+    stmt = select(FocusEvent.session_id).where(FocusEvent.compacted.is_(False))
+    if user_id is not None:
+        stmt = stmt.where(FocusEvent.user_id == user_id)
+    if kind is not None:
+        stmt = stmt.where(FocusEvent.kind == kind)
+    return stmt
+
+
+def record_event(
+    db: Session, state: dict, kind: FocusEventKind, elapsed_sec: Optional[float] = None
+) -> None:
+    """Append one event (a plain INSERT) and fold it into `state` for the response."""
+    at = datetime.utcnow()
+    db.add(FocusEvent(
+        session_id=state["id"],
+        user_id=state["user_id"],
+        kind=kind,
+        elapsed_sec=elapsed_sec,
+        at=at,
+    ))
+    apply_event(state, kind, at, elapsed_sec)
+
+
+# ---------- compaction ----------
+def _add_daily_stats(db: Session, state: dict) -> None:
+    if state["user_id"] is None:
+        return
+
+    stmt = pg_insert(FocusDailyStat).values(
+        user_id=state["user_id"],
+        day=state["completed_at"].date(),
+        sessions_completed=1,
+        focus_sec=state["elapsed_sec"],
+        pause_sec=state["pause_sec"],
+        pauses=state["pauses_count"],
+        plant_growth=state["plant_growth"],
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FocusDailyStat.user_id, FocusDailyStat.day],
+        set_={
+            "sessions_completed": FocusDailyStat.sessions_completed + 1,
+            "focus_sec": FocusDailyStat.focus_sec + stmt.excluded.focus_sec,
+            "pause_sec": FocusDailyStat.pause_sec + stmt.excluded.pause_sec,
+            "pauses": FocusDailyStat.pauses + stmt.excluded.pauses,
+            "plant_growth": FocusDailyStat.plant_growth + stmt.excluded.plant_growth,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def compact_focus_events(db: Session, batch_size: int = FOCUS_COMPACT_BATCH) -> int:
+    """
+    Fold the oldest pending events into their session rows (and completed sessions into
+    focus_daily_stats), then mark them compacted. Returns the number of events folded.
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _COMPACTOR_LOCK_ID}).scalar()
+    if not locked:
+        return 0
+
+    events = (
+        db.query(FocusEvent)
+        .filter(FocusEvent.compacted.is_(False))
+        .order_by(FocusEvent.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not events:
+        db.commit()
+        return 0
+
+    by_session: Dict[int, List[FocusEvent]] = defaultdict(list)
+    for event in events:
+        by_session[event.session_id].append(event)
+
+    # waits for timer actions holding a row (their new events stay pending for the next batch)
+    sessions = (
+        db.query(FocusSession)
+        .filter(FocusSession.id.in_(list(by_session)))
+        .order_by(FocusSession.id)
+        .with_for_update()
+        .all()
+    )
+    for sess in sessions:
+        was_completed = sess.status == SessionStatus.completed
+        state = project(sess, by_session[sess.id])
+        for field in STATE_FIELDS[1:]:
+            setattr(sess, field, state[field])
+        if not was_completed and state["status"] == SessionStatus.completed:
+            _add_daily_stats(db, state)
+
+    db.query(FocusEvent).filter(FocusEvent.id.in_([e.id for e in events])).update(
+        {FocusEvent.compacted: True}, synchronize_session=False
+    )
+    db.commit()
+    return len(events)
+
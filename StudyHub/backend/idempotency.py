@@ -0,0 +1,190 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import IdempotencyKey
+from .ratelimit import request_slot
+
+# How long a finished request can be replayed
+IDEMPOTENCY_TTL_SEC = int(os.getenv("IDEMPOTENCY_TTL_SEC", "86400"))
+# A claim with no stored response after this long is treated as crashed and may be retried
+IDEMPOTENCY_LOCK_SEC = int(os.getenv("IDEMPOTENCY_LOCK_SEC", "60"))
+
+HEADER = "idempotency-key"
+
+# Besides 2xx, the answers a retry would get from the handler again are stored and replayed.
+# Anything else (429 shedding, 403 "join first", 5xx, ...) may succeed later: the key is released.
+FINAL_CLIENT_ERRORS = {400, 404, 409, 422}
+
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/focus/sessions$"),
+    re.compile(r"^/focus/sessions/\d+/complete$"),
+    re.compile(r"^/api/challenges/\d+/join$"),
+    re.compile(r"^/api/challenges/\d+/comments$"),
+]
+
+
+# ---------- store ----------
+def _claim(key: str, method: str, path: str, request_hash: str):
+    """
+    Returns ("new", None) when this request should execute, or
+    ("stored", record) / ("busy", None) / ("mismatch", None) otherwise.
+    """
+    now = datetime.utcnow()
+    values = {
+        "key": key,
+        "method": method,
+        "path": path,
+        "request_hash": request_hash,
+        "status_code": None,
+        "content_type": None,
+        "response_body": None,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL_SEC),
+    }
+    pk = (IdempotencyKey.key == key, IdempotencyKey.method == method, IdempotencyKey.path == path)
+
+    db = SessionLocal()
+    try:
+        inserted = db.execute(
+            pg_insert(IdempotencyKey).values(**values).on_conflict_do_nothing().returning(IdempotencyKey.key)
+        ).first()
+        if not inserted:
+            # take over expired entries and abandoned claims
+            inserted = db.execute(
+                update(IdempotencyKey)
+                .where(*pk)
+                .where(or_(
+                    IdempotencyKey.expires_at < now,
+                    (IdempotencyKey.status_code.is_(None))
+                    & (IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_SEC)),
+                ))
+                .values(**{k: v for k, v in values.items() if k not in ("key", "method", "path")})
+                .returning(IdempotencyKey.key)
+            ).first()
+        db.commit()
+        if inserted:
+            return "new", None
+
+        record = db.query(IdempotencyKey).filter(*pk).first()
+        if record is None:
+            return "new", None
+        if record.request_hash != request_hash:
+            return "mismatch", None
+        if record.status_code is None:
+            return "busy", None
+        return "stored", record
+    finally:
+        db.close()
+
+
+def is_final(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in FINAL_CLIENT_ERRORS
+
+
+def _finish(key: str, method: str, path: str, status_code: int, content_type: Optional[str], body: bytes):
+    db = SessionLocal()
+    try:
+        pk = (IdempotencyKey.key == key, IdempotencyKey.method == method, IdempotencyKey.path == path)
+        if not is_final(status_code):
+            # release the key so a retry runs again
+            db.query(IdempotencyKey).filter(*pk).delete(synchronize_session=False)
+        else:
+            db.query(IdempotencyKey).filter(*pk).update(
+                {
+                    IdempotencyKey.status_code: status_code,
+                    IdempotencyKey.content_type: content_type,
+                    IdempotencyKey.response_body: body,
+                },
+                synchronize_session=False,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def purge_expired_keys(db: Session) -> int:
+    deleted = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.expires_at < datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+# ---------- middleware ----------
+async def _record(*result) -> None:
+    try:
+        async with request_slot():
+            await run_in_threadpool(_finish, *result)
+            return
+    except HTTPException:
+        pass
+    # saturated, but the handler already ran: record its result anyway (the pool queues
+    # us) rather than leave the key claimed and let a retry run the write twice
+    await run_in_threadpool(_finish, *result)
+
+
+async def idempotency_middleware(request: Request, call_next):
+    """
+    POSTs to IDEMPOTENT_ROUTES carrying an Idempotency-Key header run at most once:
+    retries get the stored response back instead of executing the write again.
+    """
+    key = request.headers.get(HEADER)
+    path = request.url.path
+    if request.method != "POST" or not key or not any(r.match(path) for r in IDEMPOTENT_ROUTES):
+        return await call_next(request)
+
+    if len(key) > 255:
+        return JSONResponse({"detail": "Idempotency-Key too long"}, status_code=400)
+
+    body = await request.body()
+    request_hash = hashlib.sha256(request.url.query.encode() + b"\0" + body).hexdigest()
+
+    try:
+        # same connection budget as the requests themselves (429 when saturated)
+        async with request_slot():
+            state, record = await run_in_threadpool(_claim, key, request.method, path, request_hash)
+    except HTTPException as e:
+        # raised outside the app's exception handlers, so render it here
+        return JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+    if state == "mismatch":
+        return JSONResponse(
+            {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+        )
+    if state == "busy":
+        return JSONResponse(
+            {"detail": "A request with this Idempotency-Key is still in progress"},
+            status_code=409,
+            headers={"Retry-After": "1"},
+        )
+    if state == "stored":
+        return Response(
+            content=record.response_body or b"",
+            status_code=record.status_code,
+            media_type=record.content_type,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        await _record(key, request.method, path, 500, None, b"")
+        raise
+
+    content = b"".join([chunk async for chunk in response.body_iterator])
+    await _record(key, request.method, path, response.status_code, response.headers.get("content-type"), content)
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    return Response(content=content, status_code=response.status_code, headers=headers)
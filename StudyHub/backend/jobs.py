@@ -0,0 +1,47 @@
+import logging
+import threading
+from typing import Callable, List
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .ratelimit import db_slot
+
+logger = logging.getLogger(__name__)
+
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+
+
+# ---------- periodic background jobs ----------
+def start_periodic(name: str, interval_sec: float, job: Callable[[Session], object]) -> None:
+    """
+    Run job(db) every interval_sec seconds in a daemon thread, each run in its own session.
+    Jobs must be idempotent: every worker process runs its own copy.
+    """
+    if interval_sec <= 0:
+        return
+
+    def loop():
+        while not _stop.wait(interval_sec):
+            # bounded by the slots reserved for jobs; waits rather than being shed
+            with db_slot():
+                db = SessionLocal()
+                try:
+                    job(db)
+                except Exception:
+                    logger.exception("Background job %s failed", name)
+                    db.rollback()
+                finally:
+                    db.close()
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    _threads.append(thread)
+
+
+def stop_all() -> None:
+    _stop.set()
+    for thread in _threads:
+        thread.join(timeout=5)
+    _threads.clear()
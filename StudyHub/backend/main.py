@@ -1,22 +1,40 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, text
 import json
+import os
 from pathlib import Path
-from .focusTime import router as focus_router
-from .challenges import router as challenges_router
+from .focusTime import router as focus_router, sweep_stale_sessions
+from .focus_events import compact_focus_events
+from .challenges import router as challenges_router, finalize_ended_challenges
+from .ranking import router as ranking_router
+from .exports import router as exports_router
+from .streaks import router as streaks_router, goal_day, record_activity
+from .dashboard import router as dashboard_router
+from . import jobs
+from .partitions import ensure_focus_partitions
+from .schema_upgrade import upgrade_schema
+from .clientinfo import client_ip
+from .ratelimit import db_admission, rate_limit
+from .conditional import make_etag, not_modified
+from .idempotency import idempotency_middleware, purge_expired_keys
+from . import profiler
 
 from . import models, schemas
-from .database import engine, SessionLocal
+from .database import engine, SessionLocal, get_db, get_read_db, pin_user, refresh_replica_lag, replica_lag
 
 print("Loaded: backend/main.py")
 
 
-app = FastAPI()
+app = FastAPI(dependencies=[Depends(db_admission)])
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Registered before CORS so replayed responses still get CORS headers
+app.middleware("http")(idempotency_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -29,26 +47,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so a profile covers the whole request; not installed at all when disabled
+if profiler.enabled():
+    app.middleware("http")(profiler.profiling_middleware)
+
 
 # Create database tables
 @app.on_event("startup")
 def init_tables():
+    # pg_trgm backs the trigram index used by challenge search
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     models.Base.metadata.create_all(bind=engine)
-
-
-app.include_router(focus_router)
-app.include_router(challenges_router)
-
-
-# Database dependency
-def get_db():
+    # create_all never alters existing tables: add the columns and indexes added since
+    with engine.begin() as conn:
+        upgrade_schema(conn)
     db = SessionLocal()
     try:
-        yield db
+        ensure_focus_partitions(db)
+    except Exception as e:
+        # never block startup on partition upkeep; the daily job retries
+        print("Focus partition maintenance failed:", e)
+        db.rollback()
     finally:
         db.close()
 
 
+# Background jobs
+@app.on_event("startup")
+def start_jobs():
+    jobs.start_periodic(
+        "challenge-finalizer",
+        float(os.getenv("CHALLENGE_FINALIZE_INTERVAL_SEC", "3600")),
+        finalize_ended_challenges,
+    )
+    jobs.start_periodic(
+        "focus-sweeper",
+        float(os.getenv("FOCUS_SWEEP_INTERVAL_SEC", "300")),
+        sweep_stale_sessions,
+    )
+    jobs.start_periodic(
+        "focus-compactor",
+        float(os.getenv("FOCUS_COMPACT_INTERVAL_SEC", "5")),
+        compact_focus_events,
+    )
+    jobs.start_periodic("focus-partitions", 24 * 3600, ensure_focus_partitions)
+
+    jobs.start_periodic("idempotency-purge", 3600, purge_expired_keys)
+
+    refresh_replica_lag()
+    jobs.start_periodic(
+        "replica-lag",
+        float(os.getenv("REPLICA_LAG_CHECK_SEC", "5")),
+        refresh_replica_lag,
+    )
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    jobs.stop_all()
+
+
+app.include_router(focus_router)
+app.include_router(challenges_router)
+app.include_router(ranking_router)
+app.include_router(exports_router)
+app.include_router(streaks_router)
+app.include_router(dashboard_router)
+app.include_router(profiler.router)
+
+
 # DB_FILE = Path("db.json")
 
 # def save_to_json(data):
@@ -68,6 +136,11 @@ def root():
     return {"message": "FastAPI backend is working!"}
 
 
+@app.get("/api/health/replicas")
+def replica_health():
+    return [{"replica": i, "lag_sec": lag} for i, lag in replica_lag.items()]
+
+
 # Register endpoint
 @app.post("/api/register")
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -94,8 +167,18 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 
+async def _login_key(request: Request) -> str:
+    # per account and caller: one bucket per IP would lock out everyone behind a shared NAT
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    email = body.get("email") if isinstance(body, dict) else None
+    return f"{str(email or '').strip().lower()}:{client_ip(request)}"
+
+
 # Login endpoint
-@app.post("/api/login")
+@app.post("/api/login", dependencies=[Depends(rate_limit("login", per_minute=10, burst=5, key=_login_key))])
 def login(user: dict, db: Session = Depends(get_db)):
     email = user.get("email")
     password = user.get("password")
@@ -141,15 +224,26 @@ def create_goal(goal: schemas.GoalCreate, db: Session = Depends(get_db)):
         color=goal.color,
     )
     db.add(new_goal)
+    pin_user(db, goal.user_id)
     db.commit()
     db.refresh(new_goal)
     return new_goal
 
 
 @app.get("/api/goals/{user_id}", response_model=list[schemas.GoalResponse])
-def get_user_goals(user_id: int, db: Session = Depends(get_db)):
+def get_user_goals(user_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     if not isinstance(user_id, int) or user_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid user ID")
+
+    last_updated, count = (
+        db.query(func.max(models.Goal.updated_at), func.count(models.Goal.id))
+        .filter(models.Goal.user_id == user_id)
+        .one()
+    )
+    cached = not_modified(request, response, make_etag("goals", user_id, last_updated, count), last_updated)
+    if cached:
+        return cached
+
     return db.query(models.Goal).filter(models.Goal.user_id == user_id).all()
 
 
@@ -159,6 +253,9 @@ def update_goal(goal_id: int, db: Session = Depends(get_db)):
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     goal.completed = not goal.completed
+    if goal.completed:
+        record_activity(db, goal.user_id, goal_day(goal))
+    pin_user(db, goal.user_id)
     db.commit()
     db.refresh(goal)
     return goal
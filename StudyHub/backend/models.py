@@ -1,10 +1,16 @@
-from sqlalchemy import (Column,Integer,String,Boolean,Float,DateTime,Enum,ForeignKey,Date,Text)
+from sqlalchemy import (Column,Integer,BigInteger,String,Boolean,Float,DateTime,Enum,ForeignKey,Date,Text,Computed,Index,LargeBinary,UniqueConstraint,text)
 import enum
+import os
 from datetime import datetime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, query_expression
 from .database import Base
 from sqlalchemy.types import JSON
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+
+# ORM_STRICT_LOADING=1 (tests / local runs): relationships and deferred JSONB columns that
+# were not loaded up front raise instead of silently issuing another query.
+STRICT_LOADING = os.getenv("ORM_STRICT_LOADING") == "1"
+LAZY = "raise_on_sql" if STRICT_LOADING else "select"
 
 
 # ---------------- USERS -----------------
@@ -32,6 +38,7 @@ class Goal(Base):
     completed = Column(Boolean, default=False)
     date = Column(String, nullable=False)
     color = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
@@ -50,7 +57,10 @@ class SessionStatus(str, enum.Enum):
 class FocusSession(Base):
     __tablename__ = "focus_sessions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned by month on created_at (see partitions.py). Postgres needs the
+    # partition key in the primary key; the ORM still identifies rows by id alone.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
     # If you have auth/users, keep user_id. Otherwise remove it.
     user_id = Column(Integer, nullable=True, index=True)
 
@@ -59,6 +69,8 @@ class FocusSession(Base):
     elapsed_sec = Column(Float, default=0.0)  # server-tracked
     pauses_count = Column(Integer, default=0)
     did_pause = Column(Boolean, default=False)
+    pause_sec = Column(Float, default=0.0, server_default='0')  # total time spent paused
+    paused_at = Column(DateTime, nullable=True)  # start of the current pause
 
     status = Column(Enum(SessionStatus), default=SessionStatus.created, nullable=False)
 
@@ -69,6 +81,57 @@ class FocusSession(Base):
     # final growth score for this session (0, 0.5, 1) set at completion
     plant_growth = Column(Float, default=0.0)
 
+    __table_args__ = (
+        # open-session scans: status endpoint and the stale-session sweeper
+        Index("ix_focus_sessions_status_updated", "status", "updated_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class FocusEventKind(str, enum.Enum):
+    start = "start"
+    pause = "pause"
+    resume = "resume"
+    complete = "complete"
+
+
+class FocusEvent(Base):
+    """Append-only timer log; folded into focus_sessions by the compactor (focus_events.py)."""
+    __tablename__ = "focus_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # no FK: the partitioned focus_sessions key also includes created_at
+    session_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+
+    kind = Column(Enum(FocusEventKind), nullable=False)
+    elapsed_sec = Column(Float, nullable=True)  # client tick sent with pause / complete
+    at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    compacted = Column(Boolean, nullable=False, default=False, server_default='false')
+
+    __table_args__ = (
+        # events not folded yet: read on every timer action and by the compactor
+        Index("ix_focus_events_pending", "session_id", "id", postgresql_where=text("NOT compacted")),
+    )
+
+
+class FocusDailyStat(Base):
+    """Per-user daily focus totals, accumulated by the event compactor."""
+    __tablename__ = "focus_daily_stats"
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    sessions_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    focus_sec = Column(Float, nullable=False, default=0.0, server_default="0")
+    pause_sec = Column(Float, nullable=False, default=0.0, server_default="0")
+    pauses = Column(Integer, nullable=False, default=0, server_default="0")
+    plant_growth = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 # ---------------- CHALLENGES -----------------
 class Challenge(Base):
@@ -84,10 +147,18 @@ class Challenge(Base):
     end_date = Column(Date, nullable=True)
 
     group_progress = Column(Integer, default=0)
-    participants = Column(JSONB, nullable=False, server_default='[]')
-    progress = Column(JSONB, nullable=False, server_default='{}')
+    # JSONB blobs are only fetched by queries that ask for them (undefer / load_only)
+    participants = deferred(Column(JSONB, nullable=False, server_default='[]'), raiseload=STRICT_LOADING)
+    # { "user_id": bitmask over ChallengeTask.bit } (see task_bits.py)
+    progress = deferred(Column(JSONB, nullable=False, server_default='{}'), raiseload=STRICT_LOADING)
 
     max_participants = Column(Integer, nullable=False, default=10)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # denormalized for list views, kept in step by join/leave/comment endpoints
+    participants_count = Column(Integer, nullable=False, default=0, server_default='0')
+    comment_count = Column(Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = Column(DateTime, nullable=True)
     #tasks = Column(JSON, default=[])
     #progress = Column(JSON, default=dict)
     #participants = Column(JSONB, default=list)
@@ -101,10 +172,48 @@ class Challenge(Base):
         "ChallengeTask",
         back_populates="challenge",
         cascade="all, delete-orphan",
-        lazy="joined",    
+        lazy=LAZY,  # load per query: selectinload() where tasks are needed, noload() elsewhere
     )
 
-    comments = relationship("Comment", back_populates="challenge", cascade="all, delete-orphan")
+    comments = relationship("Comment", back_populates="challenge", cascade="all, delete-orphan", lazy=LAZY)
+
+    # per-request values for the viewing user, filled by with_expression() when the
+    # participants / progress blobs themselves are not loaded (see challenge views)
+    viewer_joined = query_expression()
+    viewer_progress = query_expression()
+
+    # Full-text search document, maintained by Postgres (never loaded unless asked for)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(level, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+    ))
+
+    __table_args__ = (
+        Index("ix_challenges_search_vector", "search_vector", postgresql_using="gin"),
+        # trigram index (pg_trgm) for prefix / typo matching on titles
+        Index(
+            "ix_challenges_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # list sorting: most active / most discussed / almost full
+        Index("ix_challenges_last_activity", last_activity_at.desc().nullslast()),
+        Index("ix_challenges_comment_count", comment_count.desc()),
+        Index("ix_challenges_open_seats", (max_participants - participants_count)),
+        # "challenges user X joined" (participants @> '[X]')
+        Index(
+            "ix_challenges_participants",
+            "participants",
+            postgresql_using="gin",
+            postgresql_ops={"participants": "jsonb_path_ops"},
+        ),
+    )
 
 
 class ChallengeTask(Base):
@@ -115,8 +224,17 @@ class ChallengeTask(Base):
     title = Column(String, nullable=False)
     done = Column(Boolean, default=False)
 
+    # stable bit in every participant's progress mask; never changes once assigned
+    bit = Column(Integer, nullable=True)
+    # display order within the challenge
+    position = Column(Integer, nullable=True)
+
     challenge = relationship("Challenge", back_populates="tasks")
 
+    __table_args__ = (
+        UniqueConstraint("challenge_id", "bit", name="uq_challenge_tasks_challenge_bit"),
+    )
+
 
 # ---------------- COMMENT -----------------
 class Comment(Base):
@@ -132,4 +250,80 @@ class Comment(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="comments")
-    challenge = relationship("Challenge", back_populates="comments")
\ No newline at end of file
+    challenge = relationship("Challenge", back_populates="comments")
+
+
+# ---------------- CHALLENGE SNAPSHOT -----------------
+class ChallengeSnapshot(Base):
+    """Frozen final state of an ended challenge, written once by the finalizer."""
+    __tablename__ = "challenge_snapshots"
+
+    challenge_id = Column(Integer, ForeignKey("challenges.id", ondelete="CASCADE"), primary_key=True)
+
+    # format_challenge_response(...) as seen by an anonymous viewer
+    payload = deferred(Column(JSONB, nullable=False), raiseload=STRICT_LOADING)
+    leaderboard = deferred(Column(JSONB, nullable=False, server_default='[]'), raiseload=STRICT_LOADING)
+
+    group_progress = Column(Integer, default=0)
+    participants_count = Column(Integer, default=0)
+    tasks_count = Column(Integer, default=0)
+
+    finalized_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ---------------- USER SCORE -----------------
+class UserScore(Base):
+    """Running cross-challenge totals per user, updated incrementally by the write paths."""
+    __tablename__ = "user_scores"
+
+    # no FK: focus sessions may carry user ids without a users row
+    # (autoincrement=False: a lone integer PK would otherwise be created as SERIAL)
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    tasks_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    focus_minutes = Column(Float, nullable=False, default=0.0, server_default="0")
+    plant_growth = Column(Float, nullable=False, default=0.0, server_default="0")
+    score = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # ordered structure behind top-K and rank lookups
+        Index("ix_user_scores_score_desc", score.desc(), user_id),
+    )
+
+
+# ---------------- USER STREAK -----------------
+class UserStreak(Base):
+    """Consecutive active days per user, advanced in O(1) by goal / focus completions."""
+    __tablename__ = "user_streaks"
+
+    # no FK, like user_scores; autoincrement=False keeps it from being created as SERIAL
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    current_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    longest_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    last_active_day = Column(Date, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+
+# ---------------- IDEMPOTENCY KEY -----------------
+class IdempotencyKey(Base):
+    """Stored outcome of a mutation, replayed when a client retries with the same Idempotency-Key."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    method = Column(String(8), primary_key=True)
+    path = Column(String, primary_key=True)
+
+    request_hash = Column(String(64), nullable=False)
+
+    # NULL while the first request is still executing
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,100 @@
+import logging
+import re
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PARENT = "focus_sessions"
+DEFAULT_PARTITION = f"{PARENT}_default"
+_NAME = re.compile(rf"^{PARENT}_y(\d{{4}})m(\d{{2}})$")
+
+
+# ---------- month helpers ----------
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    """
+    Tables created before partitioning was introduced stay plain: upgrade_schema gives them
+    created_at, but turning them into a partitioned table means copying the data over.
+    """
+    kind = db.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"),
+        {"name": PARENT},
+    ).scalar()
+    return kind == "p"
+
+
+def _attached_partitions(db: Session) -> List[str]:
+    return list(db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": PARENT}).scalars())
+
+
+# ---------- maintenance ----------
+def ensure_focus_partitions(db: Session, months_ahead: int = 2) -> int:
+    """
+    Create monthly partitions from the current month up to months_ahead, plus a
+    DEFAULT partition as a safety net. Idempotent; meant to run at startup and daily.
+    """
+    if not is_partitioned(db):
+        logger.info("%s is not partitioned; skipping partition maintenance", PARENT)
+        return 0
+
+    existing = set(_attached_partitions(db))
+    created = 0
+    this_month = datetime.utcnow().date().replace(day=1)
+
+    for offset in range(months_ahead + 1):
+        month = _add_months(this_month, offset)
+        name = _partition_name(month)
+        if name in existing:
+            continue
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        ))
+        created += 1
+
+    if DEFAULT_PARTITION not in existing:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+    db.commit()
+    return created
+
+
+def archive_focus_partitions(db: Session, keep_months: int = 12) -> List[str]:
+    """
+    Detach monthly partitions older than keep_months. Detached tables keep their
+    data and name, ready to be dumped to cold storage and dropped.
+    """
+    if not is_partitioned(db):
+        logger.info("%s is not partitioned; nothing to archive", PARENT)
+        return []
+
+    cutoff = _add_months(datetime.utcnow().date().replace(day=1), -keep_months)
+    detached = []
+    for name in sorted(_attached_partitions(db)):
+        match = _NAME.match(name)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if month < cutoff:
+            db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+            detached.append(name)
+
+    db.commit()
+    return detached
@@ -0,0 +1,213 @@
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+
+# Profile 1 in N requests (0 = never). With PROFILE_ENABLED=1 admins can also force one
+# with "X-Profile: 1"; with neither, the middleware is not installed at all.
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+MAX_STACK_DEPTH = 128
+
+# innermost frames that mean "this thread is waiting, not working"
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+_IDLE_FUNCS = {"select", "poll", "wait", "_worker", "get"}
+
+Frame = Tuple[str, str, int]  # (function, file, line)
+
+
+# ============================================================
+# Sampler
+# ============================================================
+class _Sampler(threading.Thread):
+    """
+    Statistical profiler: every interval, snapshot the stack of every busy thread.
+    Sync handlers run in the threadpool, so there is no single request thread to
+    follow; overlapping requests can show up in each other's profiles.
+    """
+
+    def __init__(self, interval_sec: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval_sec = interval_sec
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._done.wait(self.interval_sec):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = _stack(frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _stack(frame) -> Optional[Tuple[Frame, ...]]:
+    code = frame.f_code
+    if code.co_filename.endswith(_IDLE_FILES) or code.co_name in _IDLE_FUNCS:
+        return None
+
+    stack: List[Frame] = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()  # root -> leaf
+    return tuple(stack)
+
+
+# ============================================================
+# Ring buffer of finished profiles
+# ============================================================
+class Profile:
+    def __init__(self, profile_id: int, method: str, path: str, interval_ms: float):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.interval_ms = interval_ms
+        self.started_at = datetime.utcnow()
+        self.status_code: Optional[int] = None
+        self.duration_ms = 0.0
+        self.stacks: Counter = Counter()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": sum(self.stacks.values()),
+            "started_at": self.started_at,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format, input for flamegraph.pl / speedscope."""
+        lines = [
+            ";".join(f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        frames: List[dict] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval_ms)
+
+        name = f"{self.method} {self.path} #{self.id}"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "studyhub-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+_profiles: Deque[Profile] = deque(maxlen=PROFILE_BUFFER_SIZE)
+_profile_ids = itertools.count(1)
+_request_counter = itertools.count(1)
+
+
+def enabled() -> bool:
+    """Whether to install the middleware: only when asked to, since it wraps every request."""
+    return PROFILE_ENABLED or PROFILE_SAMPLE_EVERY > 0
+
+
+def _is_admin(request: Request) -> bool:
+    token = request.headers.get("x-admin-token")
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token, ADMIN_TOKEN))
+
+
+# ============================================================
+# Middleware
+# ============================================================
+async def profiling_middleware(request: Request, call_next):
+    forced = request.headers.get("x-profile") == "1" and _is_admin(request)
+    sampled = PROFILE_SAMPLE_EVERY > 0 and next(_request_counter) % PROFILE_SAMPLE_EVERY == 0
+    if not (forced or sampled):
+        return await call_next(request)
+
+    profile = Profile(next(_profile_ids), request.method, request.url.path, PROFILE_INTERVAL_MS)
+    sampler = _Sampler(PROFILE_INTERVAL_MS / 1000)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        response = await call_next(request)
+        profile.status_code = response.status_code
+    finally:
+        sampler.stop()
+        profile.duration_ms = (time.perf_counter() - started) * 1000
+        profile.stacks = sampler.stacks
+        _profiles.append(profile)
+
+    response.headers["X-Profile-Id"] = str(profile.id)
+    return response
+
+
+# ============================================================
+# Admin endpoints
+# ============================================================
+def require_admin(request: Request) -> None:
+    if not _is_admin(request):
+        raise HTTPException(403, "Admin token required")
+
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+def list_profiles():
+    return [p.summary() for p in reversed(_profiles)]
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: int, format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    profile = next((p for p in _profiles if p.id == profile_id), None)
+    if profile is None:
+        raise HTTPException(404, "Profile not found (it may have been evicted)")
+
+    if format == "collapsed":
+        content, media_type, ext = profile.collapsed(), "text/plain", "folded"
+    else:
+        content, media_type, ext = json.dumps(profile.speedscope()), "application/json", "speedscope.json"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.{ext}"'},
+    )
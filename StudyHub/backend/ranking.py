@@ -0,0 +1,167 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .database import get_read_db
+from .models import Challenge, FocusSession, SessionStatus, User, UserScore
+from .schemas import RankingEntry
+from .task_bits import to_mask
+
+router = APIRouter(prefix="/api/ranking", tags=["ranking"])
+
+# score = tasks * TASK_POINTS + minutes * FOCUS_MINUTE_POINTS + growth * GROWTH_POINTS
+TASK_POINTS = 10.0
+FOCUS_MINUTE_POINTS = 1.0
+GROWTH_POINTS = 20.0
+
+
+# ---------- helpers ----------
+def _score_of(tasks: int, focus_minutes: float, plant_growth: float) -> float:
+    return (
+        tasks * TASK_POINTS
+        + focus_minutes * FOCUS_MINUTE_POINTS
+        + plant_growth * GROWTH_POINTS
+    )
+
+
+def bump_score(
+    db: Session,
+    user_id: int | None,
+    tasks: int = 0,
+    focus_minutes: float = 0.0,
+    plant_growth: float = 0.0,
+) -> None:
+    """
+    Add deltas to a user's running totals. Runs inside the caller's transaction,
+    so the score commits (or rolls back) together with the write that earned it.
+    """
+    if user_id is None or not (tasks or focus_minutes or plant_growth):
+        return
+
+    stmt = pg_insert(UserScore).values(
+        user_id=user_id,
+        tasks_completed=tasks,
+        focus_minutes=focus_minutes,
+        plant_growth=plant_growth,
+        score=_score_of(tasks, focus_minutes, plant_growth),
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserScore.user_id],
+        set_={
+            "tasks_completed": UserScore.tasks_completed + stmt.excluded.tasks_completed,
+            "focus_minutes": UserScore.focus_minutes + stmt.excluded.focus_minutes,
+            "plant_growth": UserScore.plant_growth + stmt.excluded.plant_growth,
+            "score": UserScore.score + stmt.excluded.score,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild_scores(db: Session) -> int:
+    """
+    Full recomputation from challenge progress and completed focus sessions.
+    Only for backfills / repairs: this scans both tables.
+    """
+    totals: dict[int, list] = {}
+
+    for (progress,) in db.query(Challenge.progress).yield_per(500):
+        for key, value in (progress or {}).items():
+            # removing a task clears its bit everywhere, so every set bit is a done task
+            done = to_mask(value).bit_count()
+            totals.setdefault(int(key), [0, 0.0, 0.0])[0] += done
+
+    focus_rows = (
+        db.query(
+            FocusSession.user_id,
+            func.coalesce(func.sum(FocusSession.elapsed_sec), 0.0),
+            func.coalesce(func.sum(FocusSession.plant_growth), 0.0),
+        )
+        .filter(
+            FocusSession.user_id.isnot(None),
+            FocusSession.status == SessionStatus.completed,
+        )
+        .group_by(FocusSession.user_id)
+        .all()
+    )
+    for uid, elapsed_sec, growth in focus_rows:
+        entry = totals.setdefault(uid, [0, 0.0, 0.0])
+        entry[1] += float(elapsed_sec) / 60
+        entry[2] += float(growth)
+
+    db.query(UserScore).delete()
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": uid,
+            "tasks_completed": tasks,
+            "focus_minutes": minutes,
+            "plant_growth": growth,
+            "score": _score_of(tasks, minutes, growth),
+            "updated_at": now,
+        }
+        for uid, (tasks, minutes, growth) in totals.items()
+    ]
+    if rows:
+        db.execute(pg_insert(UserScore), rows)
+    db.commit()
+    return len(rows)
+
+
+def _entry(rank: int, score: UserScore, name: str | None) -> RankingEntry:
+    return RankingEntry(
+        rank=rank,
+        user_id=score.user_id,
+        user_name=name,
+        score=round(score.score, 2),
+        tasks_completed=score.tasks_completed,
+        focus_minutes=round(score.focus_minutes, 2),
+        plant_growth=round(score.plant_growth, 2),
+    )
+
+
+# ---------- endpoints ----------
+@router.get("/top", response_model=List[RankingEntry])
+def top_users(
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    rows = (
+        db.query(UserScore, User.name)
+        .outerjoin(User, User.id == UserScore.user_id)
+        .order_by(UserScore.score.desc(), UserScore.user_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [_entry(offset + i + 1, score, name) for i, (score, name) in enumerate(rows)]
+
+
+@router.get("/users/{user_id}", response_model=RankingEntry)
+def user_rank(user_id: int, db: Session = Depends(get_read_db)):
+    row = (
+        db.query(UserScore, User.name)
+        .outerjoin(User, User.id == UserScore.user_id)
+        .filter(UserScore.user_id == user_id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(404, "User has no score yet")
+    score, name = row
+
+    # same tie order as /top. Two counts, each one range of the (score desc, user_id)
+    # index; an OR of both conditions would not be served by a single index range
+    higher = select(func.count()).where(UserScore.score > score.score).scalar_subquery()
+    tied_before = (
+        select(func.count())
+        .where(UserScore.score == score.score, UserScore.user_id < user_id)
+        .scalar_subquery()
+    )
+    ahead = db.query(higher + tied_before).scalar()
+    return _entry(ahead + 1, score, name)
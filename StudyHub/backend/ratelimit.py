@@ -0,0 +1,195 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+from .clientinfo import client_ip
+
+try:  # optional: shared buckets across workers (pip install redis)
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+# one address (a campus NAT) may carry this many users' worth of traffic per route
+RATE_LIMIT_PER_IP_FACTOR = float(os.getenv("RATE_LIMIT_PER_IP_FACTOR", "10"))
+
+# Global cap on work holding a DB connection; default = SQLAlchemy pool_size + max_overflow
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "15"))
+DB_ADMISSION_WAIT_SEC = float(os.getenv("DB_ADMISSION_WAIT_SEC", "2"))
+# Part of that cap kept for background jobs, so requests and jobs never add up past the pool
+DB_BACKGROUND_SLOTS = int(os.getenv("DB_BACKGROUND_SLOTS", "3"))
+
+MAX_TRACKED_KEYS = 50_000
+
+
+# ============================================================
+# Token bucket stores
+# ============================================================
+class MemoryBuckets:
+    """Per-process token buckets, LRU-bounded so idle keys cannot grow memory."""
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisBuckets:
+    """Same buckets kept in Redis so all workers share one budget. Fails open."""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        try:
+            allowed, retry = self._take(keys=[f"ratelimit:{key}"], args=[rate, capacity, time.time()])
+        except redis.RedisError:
+            logger.warning("Rate limit store unavailable, allowing request", exc_info=True)
+            return True, 0.0
+        return bool(int(allowed)), float(retry)
+
+
+def _make_store():
+    if REDIS_URL and redis is not None:
+        return RedisBuckets(REDIS_URL)
+    if REDIS_URL:
+        logger.warning("RATE_LIMIT_REDIS_URL set but redis is not installed; using in-memory buckets")
+    return MemoryBuckets()
+
+
+_store = _make_store()
+
+
+# ============================================================
+# Dependencies
+# ============================================================
+def _client_buckets(request: Request) -> List[Tuple[str, float]]:
+    """(bucket key, rate factor) pairs a request draws from."""
+    ip = client_ip(request)
+    user_id = request.query_params.get("user_id") or request.path_params.get("user_id")
+    if not user_id:
+        return [(f"ip:{ip}", 1.0)]
+    # per user, so one heavy user behind a shared NAT does not throttle the rest; plus a
+    # wider per-address ceiling, since without auth a caller can make up user ids
+    return [(f"user:{user_id}:ip:{ip}", 1.0), (f"ip:{ip}", RATE_LIMIT_PER_IP_FACTOR)]
+
+
+def _too_many(retry_after: float, detail: str = "Too many requests") -> HTTPException:
+    return HTTPException(429, detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def rate_limit(
+    route: str,
+    per_minute: int,
+    burst: int | None = None,
+    key: Optional[Callable[[Request], Awaitable[str]]] = None,
+):
+    """
+    Dependency factory: token bucket per (route, user + client IP) under a per-address
+    ceiling, per (route, client IP) for anonymous requests, or per (route, await key(request))
+    when the route knows better. Refills per_minute tokens a minute, holds at most burst.
+    """
+    rate = per_minute / 60.0
+    capacity = float(burst or per_minute)
+
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        buckets = [(await key(request), 1.0)] if key else _client_buckets(request)
+        for client, factor in buckets:
+            # the Redis store does network I/O: keep it off the event loop
+            allowed, retry_after = await run_in_threadpool(
+                _store.take, f"{route}:{client}", rate * factor, capacity * factor
+            )
+            if not allowed:
+                raise _too_many(retry_after)
+
+    return dependency
+
+
+# requests wait on an async semaphore: a waiting request holds no threadpool thread, so
+# the ones already admitted still get threads for get_db and their sync handlers
+_request_slots = anyio.Semaphore(max(1, DB_MAX_CONCURRENCY - DB_BACKGROUND_SLOTS))
+_job_slots = threading.BoundedSemaphore(max(1, DB_BACKGROUND_SLOTS))
+
+
+@asynccontextmanager
+async def request_slot(wait_sec: Optional[float] = None):
+    """Hold one of the request connection slots; 429 when none frees up in time."""
+    try:
+        with anyio.fail_after(DB_ADMISSION_WAIT_SEC if wait_sec is None else wait_sec):
+            await _request_slots.acquire()
+    except TimeoutError:
+        raise _too_many(1, "Server busy, retry shortly")
+    try:
+        yield
+    finally:
+        _request_slots.release()
+
+
+@contextmanager
+def db_slot():
+    """Hold one of the DB_BACKGROUND_SLOTS connection slots (background job threads); waits."""
+    with _job_slots:
+        yield
+
+
+async def db_admission():
+    """
+    Global admission control: at most DB_MAX_CONCURRENCY - DB_BACKGROUND_SLOTS requests in
+    flight. Extra requests wait briefly, then are shed with 429 instead of queueing on the pool.
+    The idempotency middleware takes its slots through request_slot() as well.
+    """
+    async with request_slot():
+        yield
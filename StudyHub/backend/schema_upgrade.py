@@ -0,0 +1,83 @@
+import logging
+from typing import List
+
+from sqlalchemy import UniqueConstraint, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import AddConstraint, CreateColumn, CreateIndex
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+# one worker upgrades at a time; the others wait and then find nothing to do
+_UPGRADE_LOCK_ID = 0x536368656D61  # "Schema"
+
+# One-off fills for columns added to tables that already hold rows. They run only in the
+# upgrade that adds the column, before NOT NULL is enforced on it.
+BACKFILL = {
+    # the partition key: a session is created no later than it starts
+    ("focus_sessions", "created_at"): "UPDATE focus_sessions SET created_at = COALESCE(started_at, updated_at, now())",
+    # denormalized challenge counters (same as refresh_challenge_counters)
+    ("challenges", "participants_count"): "UPDATE challenges SET participants_count = jsonb_array_length(participants)",
+    ("challenges", "comment_count"): (
+        "UPDATE challenges SET comment_count = "
+        "(SELECT count(*) FROM comments WHERE comments.challenge_id = challenges.id)"
+    ),
+    ("challenges", "last_activity_at"): (
+        "UPDATE challenges SET last_activity_at = GREATEST("
+        "(SELECT max(timestamp) FROM comments WHERE comments.challenge_id = challenges.id), updated_at)"
+    ),
+}
+
+
+def _column_ddl(column, dialect) -> str:
+    if column.nullable or column.server_default is not None or column.computed is not None:
+        return str(CreateColumn(column).compile(dialect=dialect))
+    # NOT NULL without a server default cannot be added to a non-empty table in one step
+    return f"{dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+
+
+def upgrade_schema(conn: Connection) -> List[str]:
+    """
+    create_all() only creates missing tables. Bring existing ones up to the models:
+    add missing columns (with their backfill), named unique constraints and indexes.
+    Idempotent; runs at startup right after create_all, or via
+    `python -m backend.cli upgrade-schema`.
+    Returns the "table.column" names it added.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _UPGRADE_LOCK_ID})
+    # the trigram index on challenges needs it, and the CLI does not go through startup
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    inspector = inspect(conn)
+    dialect = conn.dialect
+    added = []
+
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {_column_ddl(column, dialect)}"))
+            backfill = BACKFILL.get((table.name, column.name))
+            if backfill:
+                conn.execute(text(backfill))
+            if not column.nullable and column.server_default is None:
+                conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL"))
+            added.append(f"{table.name}.{column.name}")
+
+        # no IF NOT EXISTS for constraints: check the catalog first
+        uniques = {u["name"] for u in inspector.get_unique_constraints(table.name)}
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.name and constraint.name not in uniques:
+                conn.execute(AddConstraint(constraint))
+                logger.info("Added constraint %s", constraint.name)
+
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+    if added:
+        logger.info("Added columns: %s", ", ".join(added))
+    return added
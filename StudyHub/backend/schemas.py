@@ -57,6 +57,7 @@ class FocusResponse(BaseModel):
     elapsed_sec: float
     pauses_count: int
     did_pause: bool
+    pause_sec: float = 0.0
     status: Literal["created", "running", "paused", "completed", "canceled"]
     started_at: Optional[datetime]
     completed_at: Optional[datetime]
@@ -80,6 +81,18 @@ class FocusSummary(BaseModel):
     daily_plant_growth: float                      
 
 
+class FocusDailyStats(BaseModel):
+    day: date
+    sessions_completed: int
+    focus_sec: float
+    pause_sec: float
+    pauses: int
+    plant_growth: float
+
+    class Config:
+        from_attributes = True
+
+
 # -------------------- CHALLENGES --------------------
 
 # Task output (for frontend)
@@ -112,6 +125,16 @@ class ChallengeTaskUpdate(BaseModel):
     done: bool = False
 
 
+# Add a task to an existing challenge
+class ChallengeTaskCreate(BaseModel):
+    title: str
+
+
+# New display order: every task id exactly once
+class ChallengeTaskOrder(BaseModel):
+    task_ids: List[int]
+
+
 # Challenge Response
 class ChallengeResponse(BaseModel):
     id: int
@@ -123,9 +146,11 @@ class ChallengeResponse(BaseModel):
     start_date: date
     end_date: date
 
-    tasks: List[ChallengeTaskUpdate] = Field(default_factory=list)
+    tasks: List[ChallengeTaskOut] = Field(default_factory=list)
     participants: List[int] = Field(default_factory=list)
     participants_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
     
     progress: Dict[str, List[int]] = Field(default_factory=dict)
     group_progress: int = 0
@@ -146,9 +171,48 @@ class ChallengeResponse(BaseModel):
         orm_mode = True
 
 
+# Sparse challenge response (?view= / ?fields=): only the requested keys are sent
+class ChallengeView(BaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    level: Optional[str] = None
+    creator_id: Optional[int] = None
+    creator_name: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    tasks: Optional[List[ChallengeTaskOut]] = None
+    participants: Optional[List[int]] = None
+    participants_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    last_activity_at: Optional[datetime] = None
+
+    progress: Optional[Dict[str, List[int]]] = None
+    group_progress: Optional[int] = None
+
+    max_participants: Optional[int] = None
+    status: Optional[str] = None
+    is_creator: Optional[bool] = None
+    is_joined: Optional[bool] = None
+
+
 class ChallengeJoin(BaseModel):
     user_id: int
 
+
+# Bulk import report
+class ChallengeImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ChallengeImportReport(BaseModel):
+    valid: int
+    created: int
+    challenge_ids: List[int] = Field(default_factory=list)
+    errors: List[ChallengeImportError] = Field(default_factory=list)
+
 # -------------------- COMMENTS --------------------
 class CommentResponse(BaseModel):
     id: int
@@ -159,4 +223,47 @@ class CommentResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+# -------------------- DASHBOARD --------------------
+class ChallengeCard(BaseModel):
+    id: int
+    title: str
+    status: str
+    end_date: date
+    tasks_total: int
+    tasks_done: int
+    my_progress: float
+    group_progress: int = 0
+    participants_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+
+
+class DashboardResponse(BaseModel):
+    user_id: int
+    date: str
+    goals: List[GoalResponse] = Field(default_factory=list)
+    focus: FocusSummary
+    active_session: Optional[FocusResponse] = None
+    challenges: List[ChallengeCard] = Field(default_factory=list)
+
+
+# -------------------- RANKING --------------------
+class RankingEntry(BaseModel):
+    rank: int
+    user_id: int
+    user_name: Optional[str] = None
+    score: float
+    tasks_completed: int
+    focus_minutes: float
+    plant_growth: float
+
+
+# -------------------- STREAKS --------------------
+class StreakResponse(BaseModel):
+    user_id: int
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_active_day: Optional[date] = None
@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .database import get_read_db
+from .models import FocusSession, Goal, SessionStatus, UserStreak
+from .schemas import StreakResponse
+
+router = APIRouter(prefix="/api/streaks", tags=["streaks"])
+
+
+# ---------- helpers ----------
+def goal_day(goal: Goal) -> date | None:
+    """Goals store their day as 'YYYY-MM-DD'; future-dated goals count for today."""
+    try:
+        day = date.fromisoformat(goal.date)
+    except (TypeError, ValueError):
+        return None
+    return min(day, datetime.utcnow().date())
+
+
+def record_activity(db: Session, user_id: int | None, day: date | None) -> None:
+    """
+    Mark `day` as active for the user with one upsert (same transaction as the caller).
+    Same-day or older activity leaves the streak untouched; rebuild_streaks covers backfills.
+    """
+    if user_id is None or day is None:
+        return
+
+    stmt = pg_insert(UserStreak).values(
+        user_id=user_id,
+        current_streak=1,
+        longest_streak=1,
+        last_active_day=day,
+        updated_at=datetime.utcnow(),
+    )
+    last = UserStreak.last_active_day
+    new_current = case(
+        (last.is_(None), 1),
+        (last >= day, UserStreak.current_streak),
+        (last == day - timedelta(days=1), UserStreak.current_streak + 1),
+        else_=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStreak.user_id],
+        set_={
+            "current_streak": new_current,
+            "longest_streak": func.greatest(UserStreak.longest_streak, new_current),
+            "last_active_day": func.greatest(last, day),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def _streaks_from_days(days: list[date]) -> tuple[int, int, date | None]:
+    current = longest = 0
+    previous = None
+    for day in sorted(set(days)):
+        current = current + 1 if previous and day == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+def rebuild_streaks(db: Session, user_id: int | None = None) -> int:
+    """Recompute streak rows from full goal / focus history (backfills and repairs only)."""
+    days: dict[int, list[date]] = {}
+
+    goals = db.query(Goal.user_id, Goal.date).filter(Goal.completed.is_(True))
+    if user_id is not None:
+        goals = goals.filter(Goal.user_id == user_id)
+    for uid, raw_day in goals.distinct().yield_per(1000):
+        try:
+            day = min(date.fromisoformat(raw_day), datetime.utcnow().date())
+        except (TypeError, ValueError):
+            continue
+        days.setdefault(uid, []).append(day)
+
+    sessions = (
+        db.query(FocusSession.user_id, func.date(FocusSession.completed_at))
+        .filter(
+            FocusSession.status == SessionStatus.completed,
+            FocusSession.user_id.isnot(None),
+            FocusSession.completed_at.isnot(None),
+        )
+    )
+    if user_id is not None:
+        sessions = sessions.filter(FocusSession.user_id == user_id)
+    for uid, day in sessions.distinct().yield_per(1000):
+        days.setdefault(uid, []).append(day)
+
+    stale = db.query(UserStreak)
+    if user_id is not None:
+        stale = stale.filter(UserStreak.user_id == user_id)
+    stale.delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    rows = []
+    for uid, user_days in days.items():
+        current, longest, last = _streaks_from_days(user_days)
+        rows.append({
+            "user_id": uid,
+            "current_streak": current,
+            "longest_streak": longest,
+            "last_active_day": last,
+            "updated_at": now,
+        })
+    if rows:
+        db.execute(pg_insert(UserStreak), rows)
+    db.commit()
+    return len(rows)
+
+
+# ---------- endpoints ----------
+@router.get("/{user_id}", response_model=StreakResponse)
+def get_streak(user_id: int, db: Session = Depends(get_read_db)):
+    streak = db.get(UserStreak, user_id)
+    if not streak:
+        return StreakResponse(user_id=user_id)
+
+    # a streak is only still "current" if the user was active today or yesterday
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    alive = streak.last_active_day is not None and streak.last_active_day >= yesterday
+    return StreakResponse(
+        user_id=user_id,
+        current_streak=streak.current_streak if alive else 0,
+        longest_streak=streak.longest_streak,
+        last_active_day=streak.last_active_day,
+    )
@@ -0,0 +1,74 @@
+"""
+Challenge progress is stored as one integer bitmask per user: {"user_id": mask}.
+Every ChallengeTask owns a stable `bit`, so adding, removing or reordering tasks
+never shifts anyone's progress. Display order lives separately in `position`.
+
+Older rows hold 0/1 arrays indexed by task-id order; they read as bit i = index i,
+which is exactly the bit assignment unassigned (legacy) tasks receive.
+"""
+from itertools import count
+from typing import Dict, Iterable, List
+
+
+def ordered_tasks(tasks: Iterable) -> List:
+    """Display order: position, then id (legacy tasks have no position yet)."""
+    return sorted(tasks, key=lambda t: (t.position is None, t.position or 0, t.id))
+
+
+def task_bit_map(tasks: Iterable) -> Dict[int, int]:
+    """task id -> bit. Tasks without a bit get the next free ones in id order."""
+    tasks = list(tasks)
+    bits = {t.id: t.bit for t in tasks if t.bit is not None}
+    next_bit = max(bits.values()) + 1 if bits else 0
+    for t in sorted((t for t in tasks if t.bit is None), key=lambda t: t.id):
+        bits[t.id] = next_bit
+        next_bit += 1
+    return bits
+
+
+def assign_task_bits(tasks: Iterable) -> None:
+    """Persist bits / positions for tasks that predate them (call on write paths)."""
+    tasks = list(tasks)
+    for t in tasks:
+        if t.id is None:
+            raise ValueError("flush new tasks before assigning bits")
+    bits = task_bit_map(tasks)
+    for position, t in enumerate(ordered_tasks(tasks)):
+        if t.bit is None:
+            t.bit = bits[t.id]
+        if t.position is None:
+            t.position = position
+
+
+def next_free_bit(tasks: Iterable) -> int:
+    """Lowest bit no task holds: removing a task clears its bit from every mask, so it is reusable."""
+    used = set(task_bit_map(tasks).values())
+    return next(bit for bit in count() if bit not in used)
+
+
+def to_mask(value) -> int:
+    """Stored progress value (int mask, or legacy 0/1 list) -> int mask."""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, list):
+        return sum(1 << i for i, x in enumerate(value) if x)
+    return 0
+
+
+def tasks_mask(bits: Dict[int, int]) -> int:
+    mask = 0
+    for bit in bits.values():
+        mask |= 1 << bit
+    return mask
+
+
+def done_count(value, all_tasks_mask: int) -> int:
+    return (to_mask(value) & all_tasks_mask).bit_count()
+
+
+def progress_array(value, ordered: List, bits: Dict[int, int]) -> List[int]:
+    """Mask -> 0/1 list in display order (the shape the API has always returned)."""
+    mask = to_mask(value)
+    return [(mask >> bits[t.id]) & 1 for t in ordered]
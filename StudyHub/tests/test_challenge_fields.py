@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backend import models
+from backend.challenges import (
+    CARD_FIELDS,
+    CHALLENGE_FIELDS,
+    challenge_fields,
+    challenge_load_options,
+    format_challenge_response,
+)
+
+
+def _sql(fields, current_user_id=None) -> str:
+    stmt = select(models.Challenge).options(*challenge_load_options(fields, current_user_id))
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _challenge():
+    return models.Challenge(
+        id=1, title="Read", level="easy", creator_name="a", creator_id=7,
+        start_date=date(2026, 1, 1), end_date=date(2099, 1, 1),
+        participants=[7, 8], participants_count=2, progress={"8": 1},
+        max_participants=10, comment_count=0, group_progress=50,
+    )
+
+
+def test_default_view_is_the_full_response():
+    assert challenge_fields(view="full", fields=None) == CHALLENGE_FIELDS
+    assert challenge_fields(view="card", fields=None) == CARD_FIELDS
+
+
+def test_fields_override_the_view_and_always_carry_the_id():
+    assert challenge_fields(view="card", fields="title, status,title") == ("id", "title", "status")
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as e:
+        challenge_fields(view="full", fields="title,secret,password")
+    assert e.value.status_code == 400
+    assert "secret, password" in e.value.detail
+
+
+def test_card_view_loads_no_blobs():
+    sql = _sql(CARD_FIELDS, current_user_id=8)
+    assert "challenges.title" in sql
+    assert "challenges.progress" not in sql
+    # membership comes from a containment test, not the participants list
+    assert "challenges.participants @>" in sql
+
+
+def test_full_view_loads_the_blobs():
+    sql = _sql(CHALLENGE_FIELDS)
+    assert "challenges.progress" in sql and "challenges.participants" in sql
+
+
+def test_card_response_has_exactly_the_card_fields():
+    out = format_challenge_response(_challenge(), 8, CARD_FIELDS)
+    assert set(out) == set(CARD_FIELDS)
+    assert "progress" not in out and "tasks" not in out
+    assert out["is_joined"] is True and out["is_creator"] is False
+    assert out["status"] == "Active"
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from backend.challenge_import import _validate, parse_import_file
+
+HEADER = "title,description,level,creator_name,creator_id,start_date,end_date,max_participants,tasks,participants\n"
+
+
+def test_csv_list_cells_split_on_semicolons_and_pipes():
+    content = (
+        HEADER
+        + "Read,,Easy,Ann,1,2026-01-01,2026-02-01,5,ch. 1; ch. 2 ;;ch. 3,2;3\n"
+        + "Write,,,Ann,1,2026-01-01,2026-02-01,,draft|edit,\n"
+    ).encode()
+    first, second = parse_import_file("cohort.CSV", content)
+    assert first["tasks"] == ["ch. 1", "ch. 2", "ch. 3"]
+    assert first["participants"] == ["2", "3"]
+    assert first["level"] == "Easy" and "description" not in first
+    assert second["tasks"] == ["draft", "edit"] and second["participants"] == []
+    assert "level" not in second and "max_participants" not in second
+
+
+def test_csv_with_a_byte_order_mark():
+    rows = parse_import_file("c.csv", ("\ufeff" + HEADER + "Read,,,Ann,1,2026-01-01,2026-02-01,,a,\n").encode())
+    assert rows[0]["title"] == "Read"
+
+
+def test_json_list_or_wrapped_object():
+    row = {"title": "Read"}
+    assert parse_import_file("c.json", json.dumps([row]).encode()) == [row]
+    assert parse_import_file("c.json", json.dumps({"challenges": [row]}).encode()) == [row]
+
+
+@pytest.mark.parametrize("content", [b'[{"title": "Read",', b'"just a string"'])
+def test_malformed_json_is_a_value_error(content):
+    with pytest.raises(ValueError):
+        parse_import_file("c.json", content)
+
+
+def test_non_utf8_body_is_rejected():
+    with pytest.raises(UnicodeDecodeError):
+        parse_import_file("c.csv", HEADER.encode() + "Lecture,,,José,1\n".encode("latin-1"))
+
+
+def test_validation_reports_each_bad_row_by_number():
+    good = {
+        "title": "Read", "creator_name": "Ann", "creator_id": 1,
+        "start_date": "2026-01-01", "end_date": "2026-02-01", "tasks": [" a ", "", "b"],
+        "participants": [2, 2, 3],
+    }
+    rows = [
+        good,
+        "not an object",
+        {**good, "creator_id": "x"},
+        {**good, "end_date": "2025-12-01"},
+        {**good, "max_participants": 2},
+    ]
+    valid, errors = _validate(rows)
+
+    assert [(row_no, tasks, participants) for row_no, _, tasks, participants in valid] == [(1, ["a", "b"], [2, 3, 1])]
+    assert [e["row"] for e in errors] == [2, 3, 4, 5]
+    assert errors[0]["errors"] == ["Expected an object"]
+    assert errors[1]["errors"][0].startswith("creator_id:")
+    assert errors[2]["errors"] == ["end_date: must not be before start_date"]
+    assert errors[3]["errors"] == ["participants: more than max_participants"]
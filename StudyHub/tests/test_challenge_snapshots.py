@@ -0,0 +1,44 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from backend import challenges
+from backend.challenges import finalize_ended_challenges, format_snapshot_response
+
+PAYLOAD = {
+    "id": 1,
+    "creator_id": 7,
+    "participants": [7, 8],
+    "participants_count": 2,
+    "comment_count": 3,
+    "last_activity_at": "2026-01-31T10:00:00",
+    "tasks": [{"id": 11, "title": "read"}, {"id": 12, "title": "write"}],
+    "progress": {"8": [1, 0]},
+}
+
+
+def test_snapshot_is_served_per_viewer():
+    data = format_snapshot_response(SimpleNamespace(payload=PAYLOAD), 8)
+    assert data["is_joined"] and not data["is_creator"]
+    assert [t["done"] for t in data["tasks"]] == [True, False]
+    assert data["comment_count"] == 3
+
+
+def test_live_counters_override_the_frozen_ones():
+    live = SimpleNamespace(participants_count=2, comment_count=5, last_activity_at=datetime(2026, 2, 3))
+    data = format_snapshot_response(SimpleNamespace(payload=PAYLOAD), None, live)
+    assert data["comment_count"] == 5
+    assert data["last_activity_at"] == datetime(2026, 2, 3)
+    # the stored payload itself is left alone
+    assert PAYLOAD["comment_count"] == 3
+
+
+def test_finalizer_runs_batches_until_a_short_one(monkeypatch):
+    batches = iter([3, 3, 1, 3])
+    monkeypatch.setattr(challenges, "_finalize_batch", lambda db, size: next(batches))
+    assert finalize_ended_challenges(None, batch_size=3) == 7
+
+
+def test_finalizer_stops_when_another_worker_holds_the_lock(monkeypatch):
+    batches = iter([3, None, 3])
+    monkeypatch.setattr(challenges, "_finalize_batch", lambda db, size: next(batches))
+    assert finalize_ended_challenges(None, batch_size=3) == 3
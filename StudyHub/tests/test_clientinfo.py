@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from backend import clientinfo
+from backend.clientinfo import client_ip
+
+
+def _request(peer, forwarded=None):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers)
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", set())
+    assert client_ip(_request("10.0.0.1", "1.2.3.4")) == "10.0.0.1"
+
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", {"10.0.0.1"})
+    assert client_ip(_request("10.9.9.9", "1.2.3.4")) == "10.9.9.9"
+
+
+def test_client_ip_takes_the_hop_before_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", {"10.0.0.1", "10.0.0.2"})
+    # the leftmost entry is whatever the caller sent and is not trusted
+    assert client_ip(_request("10.0.0.1", "6.6.6.6, 1.2.3.4, 10.0.0.2")) == "1.2.3.4"
+    assert client_ip(_request("10.0.0.1")) == "10.0.0.1"
+
+
+def test_client_ip_wildcard_trusts_only_the_connecting_proxy(monkeypatch):
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", {"*"})
+    assert client_ip(_request("10.0.0.1", "6.6.6.6, 1.2.3.4")) == "1.2.3.4"
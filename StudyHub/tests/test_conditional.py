@@ -0,0 +1,56 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import Response
+
+from backend.conditional import make_etag, not_modified
+
+UPDATED = datetime(2026, 3, 1, 12, 30, 15, 250000)
+
+
+def _request(**headers):
+    return SimpleNamespace(headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+
+def test_make_etag_is_weak_and_tracks_its_parts():
+    etag = make_etag("challenge", 1, UPDATED)
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag("challenge", 1, UPDATED)
+    assert etag != make_etag("challenge", 2, UPDATED)
+    assert etag != make_etag("challenge", 1, UPDATED, "view=card")
+
+
+def test_validators_are_set_on_a_fresh_response():
+    response = Response()
+    assert not_modified(_request(), response, '"x"', UPDATED) is None
+    assert response.headers["etag"] == '"x"'
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 12:30:15 GMT"
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag("goals", 7)
+    strong = etag.removeprefix("W/")
+
+    cached = not_modified(_request(if_none_match=f'"other", {strong}'), Response(), etag)
+    assert cached is not None and cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    assert not_modified(_request(if_none_match="*"), Response(), etag).status_code == 304
+    assert not_modified(_request(if_none_match='"other"'), Response(), etag) is None
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    request = _request(if_none_match='"other"', if_modified_since="Sun, 01 Mar 2026 13:00:00 GMT")
+    assert not_modified(request, Response(), '"x"', UPDATED) is None
+
+
+def test_if_modified_since_compares_whole_seconds():
+    same_second = _request(if_modified_since="Sun, 01 Mar 2026 12:30:15 GMT")
+    assert not_modified(same_second, Response(), '"x"', UPDATED).status_code == 304
+
+    earlier = _request(if_modified_since="Sun, 01 Mar 2026 12:30:14 GMT")
+    assert not_modified(earlier, Response(), '"x"', UPDATED) is None
+
+    garbage = _request(if_modified_since="yesterday")
+    assert not_modified(garbage, Response(), '"x"', UPDATED) is None
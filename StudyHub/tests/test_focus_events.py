@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from backend.focus_events import STATE_FIELDS, _compute_growth, apply_event, project
+from backend.models import FocusEventKind, SessionStatus
+
+T0 = datetime(2026, 3, 1, 9, 0, 0)
+
+
+def _at(minutes: float) -> datetime:
+    return T0 + timedelta(minutes=minutes)
+
+
+def _session(**overrides):
+    row = {field: None for field in STATE_FIELDS}
+    row.update(id=1, user_id=7, title="focus", duration_min=25, status=SessionStatus.created)
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def _event(kind, minutes, elapsed_sec=None):
+    return SimpleNamespace(kind=kind, at=_at(minutes), elapsed_sec=elapsed_sec)
+
+
+def test_project_without_events_normalizes_the_row():
+    state = project(_session())
+    assert state["status"] == SessionStatus.created
+    assert (state["elapsed_sec"], state["pauses_count"], state["pause_sec"], state["plant_growth"]) == (0.0, 0, 0.0, 0.0)
+    assert state["did_pause"] is False
+
+
+def test_uninterrupted_session_grows_fully():
+    state = project(_session(), [
+        _event(FocusEventKind.start, 0),
+        _event(FocusEventKind.complete, 25, elapsed_sec=1500),
+    ])
+    assert state["status"] == SessionStatus.completed
+    assert state["started_at"] == T0 and state["completed_at"] == _at(25)
+    assert state["plant_growth"] == 1.0
+
+
+def test_pauses_are_counted_and_timed():
+    state = project(_session(), [
+        _event(FocusEventKind.start, 0),
+        _event(FocusEventKind.pause, 10, elapsed_sec=600),
+        _event(FocusEventKind.resume, 13),
+        _event(FocusEventKind.pause, 20, elapsed_sec=1020),
+        # completing while paused closes the open pause
+        _event(FocusEventKind.complete, 21, elapsed_sec=1400),
+    ])
+    assert state["pauses_count"] == 2
+    assert state["did_pause"] is True
+    assert state["pause_sec"] == pytest.approx(240)
+    assert state["paused_at"] is None
+    assert state["plant_growth"] == 0.66
+
+
+def test_elapsed_is_capped_at_the_planned_length():
+    state = project(_session(), [
+        _event(FocusEventKind.start, 0),
+        _event(FocusEventKind.complete, 40, elapsed_sec=99999),
+    ])
+    assert state["elapsed_sec"] == 1500
+
+
+def test_disallowed_transitions_leave_the_state_untouched():
+    state = project(_session())
+    before = dict(state)
+    assert apply_event(state, FocusEventKind.pause, _at(1), 60) is False
+    assert apply_event(state, FocusEventKind.resume, _at(1)) is False
+    assert apply_event(state, FocusEventKind.complete, _at(1), 60) is False
+    assert state == before
+
+
+def test_duplicate_events_replay_harmlessly():
+    events = [
+        _event(FocusEventKind.start, 0),
+        _event(FocusEventKind.start, 0.1),
+        _event(FocusEventKind.complete, 25, elapsed_sec=1500),
+        _event(FocusEventKind.complete, 26, elapsed_sec=1200),
+    ]
+    state = project(_session(), events)
+    assert state["started_at"] == T0
+    assert state["completed_at"] == _at(25)
+    assert state["elapsed_sec"] == 1500
+
+
+def test_project_continues_from_a_folded_row():
+    row = _session(status=SessionStatus.paused, started_at=T0, elapsed_sec=600.0,
+                   pauses_count=1, did_pause=True, pause_sec=0.0, paused_at=_at(10))
+    state = project(row, [_event(FocusEventKind.start, 12)])
+    assert state["status"] == SessionStatus.running
+    assert state["pause_sec"] == pytest.approx(120)
+    assert state["started_at"] == T0
+
+
+@pytest.mark.parametrize("elapsed, did_pause, growth", [
+    (1500, False, 1.0),
+    (1049, False, 0.0),
+    (1350, True, 0.66),
+    (1100, True, 0.33),
+    (800, True, 0.0),
+])
+def test_growth_levels(elapsed, did_pause, growth):
+    assert _compute_growth(25, elapsed, did_pause, SessionStatus.completed) == growth
+    assert _compute_growth(25, elapsed, did_pause, SessionStatus.canceled) == 0.0
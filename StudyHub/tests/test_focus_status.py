@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import focusTime
+from backend.database import get_db, get_read_db
+from backend.models import FocusSession, SessionStatus
+
+T0 = datetime(2026, 3, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    # created by hand: SQLite cannot build the partitioned (id, created_at) key or
+    # autoincrement a BIGINT one
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE focus_sessions (id INTEGER PRIMARY KEY, created_at DATETIME NOT NULL, "
+            "user_id INTEGER, title VARCHAR NOT NULL, duration_min INTEGER NOT NULL, elapsed_sec FLOAT, "
+            "pauses_count INTEGER, did_pause BOOLEAN, pause_sec FLOAT, paused_at DATETIME, "
+            "status VARCHAR(9) NOT NULL, started_at DATETIME, completed_at DATETIME, "
+            "updated_at DATETIME, plant_growth FLOAT)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE focus_events (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, "
+            "user_id INTEGER, kind VARCHAR(8) NOT NULL, elapsed_sec FLOAT, at DATETIME NOT NULL, "
+            "compacted BOOLEAN NOT NULL DEFAULT 0)"
+        ))
+    SessionLocal = sessionmaker(bind=engine)
+
+    def _db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(focusTime.router)
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_read_db] = _db
+
+    with SessionLocal() as db:
+        db.add_all([
+            FocusSession(id=1, created_at=T0, user_id=7, title="a", duration_min=25, updated_at=T0),
+            FocusSession(
+                id=2, created_at=T0, user_id=8, title="b", duration_min=25, status=SessionStatus.paused,
+                started_at=T0, paused_at=T0 + timedelta(minutes=5), elapsed_sec=300, updated_at=T0,
+            ),
+        ])
+        db.commit()
+    return TestClient(app)
+
+
+def test_status_is_active_right_after_start(client):
+    assert client.get("/focus/status", params={"user_id": 7}).json() == {"active": False}
+    assert client.post("/focus/sessions/1/start").status_code == 200
+    # the row still says "created" until the compactor runs
+    assert client.get("/focus/status", params={"user_id": 7}).json() == {"active": True, "remaining": 1500}
+
+
+def test_status_counts_a_pending_resume_and_drops_a_pending_pause(client):
+    assert client.get("/focus/status", params={"user_id": 8}).json() == {"active": False}
+    assert client.post("/focus/sessions/2/resume").status_code == 200
+    assert client.get("/focus/status", params={"user_id": 8}).json() == {"active": True, "remaining": 1200}
+
+    assert client.post("/focus/sessions/2/pause", json={"elapsed_sec": 360}).status_code == 200
+    assert client.get("/focus/status", params={"user_id": 8}).json() == {"active": False}
+
+
+def test_last_modified_moves_with_pending_events(client):
+    before = client.get("/focus/sessions", params={"user_id": 7})
+    assert client.post("/focus/sessions/1/start").status_code == 200
+    after = client.get("/focus/sessions", params={"user_id": 7})
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.headers["last-modified"] != before.headers["last-modified"]
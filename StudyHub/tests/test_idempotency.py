@@ -0,0 +1,109 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from backend import idempotency
+from backend.idempotency import idempotency_middleware, is_final
+
+
+class FakeStore:
+    """In-memory stand-in for the idempotency_keys table."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def claim(self, key, method, path, request_hash):
+        row = self.rows.get((key, method, path))
+        if row is None:
+            self.rows[(key, method, path)] = {"hash": request_hash, "status": None}
+            return "new", None
+        if row["hash"] != request_hash:
+            return "mismatch", None
+        if row["status"] is None:
+            return "busy", None
+        return "stored", type("Record", (), {
+            "status_code": row["status"], "content_type": row["type"], "response_body": row["body"],
+        })
+
+    def finish(self, key, method, path, status_code, content_type, body):
+        if not is_final(status_code):
+            del self.rows[(key, method, path)]
+        else:
+            self.rows[(key, method, path)].update(status=status_code, type=content_type, body=body)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(idempotency, "_claim", store.claim)
+    monkeypatch.setattr(idempotency, "_finish", store.finish)
+
+    app = FastAPI()
+    app.middleware("http")(idempotency_middleware)
+    app.state.calls = 0
+    app.state.status = 200
+
+    @app.post("/api/challenges/{challenge_id}/join")
+    def join(challenge_id: int, user_id: int):
+        app.state.calls += 1
+        if app.state.status != 200:
+            raise HTTPException(app.state.status, "nope")
+        return {"challenge_id": challenge_id, "user_id": user_id, "call": app.state.calls}
+
+    return TestClient(app), app.state
+
+
+def _join(client, key="k1", user_id=1):
+    return client.post(f"/api/challenges/5/join?user_id={user_id}", headers={"Idempotency-Key": key})
+
+
+def test_is_final():
+    assert is_final(200) and is_final(201)
+    assert all(is_final(s) for s in (400, 404, 409, 422))
+    assert not any(is_final(s) for s in (403, 429, 500, 503))
+
+
+def test_retry_replays_the_stored_response(client):
+    client, state = client
+    first = _join(client)
+    again = _join(client)
+
+    assert state.calls == 1
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["idempotent-replayed"] == "true"
+
+
+def test_same_key_with_a_different_request_is_rejected(client):
+    client, state = client
+    _join(client)
+    assert _join(client, user_id=2).status_code == 422
+    assert state.calls == 1
+
+
+def test_deterministic_client_errors_are_replayed(client):
+    client, state = client
+    state.status = 404
+    assert _join(client).status_code == 404
+    state.status = 200
+    assert _join(client).status_code == 404
+    assert state.calls == 1
+
+
+@pytest.mark.parametrize("status", [429, 403, 500])
+def test_transient_failures_release_the_key(client, status):
+    client, state = client
+    state.status = status
+    assert _join(client).status_code == status
+    state.status = 200
+    retry = _join(client)
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    assert state.calls == 2
+
+
+def test_requests_without_a_key_are_not_tracked(client):
+    client, state = client
+    client.post("/api/challenges/5/join?user_id=1")
+    client.post("/api/challenges/5/join?user_id=1")
+    assert state.calls == 2
@@ -0,0 +1,49 @@
+import json
+from collections import Counter
+
+import pytest
+
+from backend import profiler
+from backend.profiler import Profile
+
+OUTER = ("handler", "/app/backend/main.py", 10)
+QUERY = ("execute", "/venv/sqlalchemy/engine/base.py", 200)
+RENDER = ("render", "/app/backend/schemas.py", 33)
+
+
+def _profile():
+    profile = Profile(7, "GET", "/api/challenges", interval_ms=5)
+    profile.stacks = Counter({(OUTER, QUERY): 3, (OUTER, RENDER): 1})
+    return profile
+
+
+@pytest.mark.parametrize("enabled, sample_every, expected", [
+    (False, 0, False),
+    (True, 0, True),
+    (False, 100, True),
+])
+def test_middleware_is_installed_only_when_asked_for(monkeypatch, enabled, sample_every, expected):
+    monkeypatch.setattr(profiler, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiler, "PROFILE_ENABLED", enabled)
+    monkeypatch.setattr(profiler, "PROFILE_SAMPLE_EVERY", sample_every)
+    assert profiler.enabled() is expected
+
+
+def test_collapsed_stacks_are_folded_root_first_hottest_first():
+    assert _profile().collapsed() == (
+        "handler (main.py:10);execute (base.py:200) 3\n"
+        "handler (main.py:10);render (schemas.py:33) 1\n"
+    )
+
+
+def test_speedscope_shares_frames_and_weights_samples_by_interval():
+    doc = json.loads(json.dumps(_profile().speedscope()))
+    frames = doc["shared"]["frames"]
+    assert [f["name"] for f in frames] == ["handler", "execute", "render"]
+
+    (sampled,) = doc["profiles"]
+    assert sampled["type"] == "sampled" and sampled["unit"] == "milliseconds"
+    assert sampled["samples"] == [[0, 1], [0, 2]]
+    assert sampled["weights"] == [15, 5]
+    assert sampled["endValue"] == 20
+    assert sampled["name"] == doc["name"] == "GET /api/challenges #7"
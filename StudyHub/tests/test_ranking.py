@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.models import User, UserScore
+from backend.ranking import top_users, user_rank
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    UserScore.__table__.create(engine)
+    with Session(engine) as session:
+        # 5, 2 and 9 tie on 50 points
+        for user_id, points in [(5, 50), (1, 80), (9, 50), (2, 50), (4, 10)]:
+            session.add(UserScore(user_id=user_id, score=points))
+        session.commit()
+        yield session
+
+
+def test_ties_rank_by_user_id(db):
+    assert [user_rank(uid, db).rank for uid in (1, 2, 5, 9, 4)] == [1, 2, 3, 4, 5]
+
+
+def test_user_rank_matches_the_top_list(db):
+    top = top_users(limit=10, offset=0, db=db)
+    assert [(e.rank, user_rank(e.user_id, db).rank) for e in top] == [(r, r) for r in range(1, 6)]
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import anyio
+import pytest
+from fastapi import HTTPException
+
+from backend import clientinfo, ratelimit
+from backend.ratelimit import MemoryBuckets, _client_buckets, rate_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _request(peer, forwarded=None, user_id=None):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    query = {"user_id": str(user_id)} if user_id is not None else {}
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers, query_params=query, path_params={})
+
+
+def test_burst_then_refill(clock):
+    buckets = MemoryBuckets()
+    rate, capacity = 1.0, 3.0  # 60/min, burst 3
+
+    assert [buckets.take("k", rate, capacity)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = buckets.take("k", rate, capacity)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+    clock[0] += 0.5
+    allowed, retry_after = buckets.take("k", rate, capacity)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert buckets.take("k", rate, capacity)[0]
+
+
+def test_refill_is_capped_at_capacity(clock):
+    buckets = MemoryBuckets()
+    buckets.take("k", 1.0, 2.0)
+    clock[0] += 3600
+    assert [buckets.take("k", 1.0, 2.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_are_independent_and_lru_bounded(clock):
+    buckets = MemoryBuckets(max_keys=2)
+    assert buckets.take("a", 1.0, 1.0)[0]
+    assert not buckets.take("a", 1.0, 1.0)[0]
+    assert buckets.take("b", 1.0, 1.0)[0]
+    buckets.take("c", 1.0, 1.0)
+    # "a" was least recently used and got evicted: it starts over with a full bucket
+    assert buckets.take("a", 1.0, 1.0)[0]
+
+
+def test_buckets_are_per_user_under_a_per_address_ceiling(monkeypatch):
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", set())
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_PER_IP_FACTOR", 10.0)
+    assert _client_buckets(_request("1.2.3.4")) == [("ip:1.2.3.4", 1.0)]
+    assert _client_buckets(_request("1.2.3.4", user_id=7)) == [
+        ("user:7:ip:1.2.3.4", 1.0),
+        ("ip:1.2.3.4", 10.0),
+    ]
+
+
+def test_users_behind_one_address_do_not_share_a_bucket(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "_store", MemoryBuckets())
+    monkeypatch.setattr(clientinfo, "TRUSTED_PROXIES", set())
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_PER_IP_FACTOR", 3.0)
+    limit = rate_limit("toggle", per_minute=60, burst=2)
+
+    def call(user_id):
+        try:
+            anyio.run(limit, _request("10.0.0.9", user_id=user_id))
+            return 200
+        except HTTPException as e:
+            return e.status_code
+
+    assert [call(1) for _ in range(3)] == [200, 200, 429]
+    # a neighbour on the same NAT still has their own budget
+    assert [call(2) for _ in range(2)] == [200, 200]
+    # but made-up user ids cannot go past the address ceiling (3 x burst)
+    assert [call(3), call(4)] == [200, 200]
+    assert call(5) == 429
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from backend import database
+from backend.database import MemoryPins, RedisPins, SessionLocal, pin_user, request_keys
+
+
+def _request(query=None, path=None, peer="10.0.0.7"):
+    return SimpleNamespace(
+        query_params=query or {}, path_params=path or {}, headers={}, client=SimpleNamespace(host=peer)
+    )
+
+
+def test_user_keys_replace_the_client_address():
+    assert request_keys(_request(query={"user_id": "3"})) == ["user:3"]
+    assert request_keys(_request(path={"user_id": "4"}, query={"current_user_id": "5"})) == ["user:4", "user:5"]
+
+
+def test_anonymous_requests_fall_back_to_the_client_address():
+    assert request_keys(_request()) == ["ip:10.0.0.7"]
+
+
+def test_pin_user_adds_body_user_ids_and_drops_the_address():
+    db = SessionLocal()
+    db.info["request_keys"] = ["ip:10.0.0.7"]
+    pin_user(db, 9)
+    assert db.info["request_keys"] == ["user:9"]
+
+    pin_user(db, None)
+    assert db.info["request_keys"] == ["user:9"]
+    db.close()
+
+
+def test_memory_pins_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    pins = MemoryPins()
+    pins.pin(["user:1"], 5)
+    assert pins.pinned(["ip:10.0.0.7", "user:1"])
+    now[0] += 6
+    assert not pins.pinned(["user:1"])
+
+
+class _FakeRedis:
+    """The few redis-py calls RedisPins makes, on a dict (TTLs are only recorded)."""
+
+    def __init__(self):
+        self.keys = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, px=None):
+        self.keys[key] = px
+
+    def execute(self):
+        pass
+
+    def exists(self, *keys):
+        return sum(key in self.keys for key in keys)
+
+
+def test_redis_pins_are_shared_between_workers():
+    shared = _FakeRedis()
+    writer, reader = RedisPins.__new__(RedisPins), RedisPins.__new__(RedisPins)
+    writer._client = reader._client = shared
+
+    writer.pin(["user:3"], 5)
+    assert shared.keys == {"ryw:user:3": 5000}
+    assert reader.pinned(["user:3"])
+    assert not reader.pinned(["user:4"])
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from backend import models, schema_upgrade
+from backend.schema_upgrade import BACKFILL, _column_ddl, upgrade_schema
+
+DIALECT = postgresql.dialect()
+
+
+def _ddl(table: str, column: str) -> str:
+    return _column_ddl(models.Base.metadata.tables[table].c[column], DIALECT)
+
+
+def test_not_null_without_default_is_added_nullable_then_backfilled():
+    assert _ddl("focus_sessions", "created_at") == "created_at TIMESTAMP WITHOUT TIME ZONE"
+    assert ("focus_sessions", "created_at") in BACKFILL
+
+
+def test_server_defaults_and_generated_columns_are_added_as_declared():
+    assert _ddl("focus_sessions", "pause_sec") == "pause_sec FLOAT DEFAULT '0'"
+    assert _ddl("challenges", "comment_count") == "comment_count INTEGER DEFAULT '0' NOT NULL"
+    assert "GENERATED ALWAYS AS" in _ddl("challenges", "search_vector")
+
+
+
+class _UpToDateInspector:
+    """Every table and column exists; unique constraints as given."""
+
+    def __init__(self, uniques):
+        self.uniques = uniques
+
+    def has_table(self, name):
+        return True
+
+    def get_columns(self, name):
+        return [{"name": c.name} for c in models.Base.metadata.tables[name].columns]
+
+    def get_unique_constraints(self, name):
+        return [{"name": n} for n in self.uniques.get(name, ())]
+
+
+def _run_upgrade(monkeypatch, uniques) -> list:
+    statements = []
+    conn = SimpleNamespace(
+        dialect=DIALECT,
+        execute=lambda stmt, *args: statements.append(str(stmt.compile(dialect=DIALECT))),
+    )
+    monkeypatch.setattr(schema_upgrade, "inspect", lambda c: _UpToDateInspector(uniques))
+    assert upgrade_schema(conn) == []
+    return statements
+
+
+def test_extension_comes_before_the_trigram_index(monkeypatch):
+    statements = _run_upgrade(monkeypatch, {})
+    assert statements[1] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    trigram = next(i for i, s in enumerate(statements) if "gin_trgm_ops" in s)
+    assert trigram > 1
+
+
+def test_missing_unique_constraints_are_added_once(monkeypatch):
+    added = [s for s in _run_upgrade(monkeypatch, {}) if s.startswith("ALTER TABLE challenge_tasks ADD CONSTRAINT")]
+    assert added == ["ALTER TABLE challenge_tasks ADD CONSTRAINT uq_challenge_tasks_challenge_bit UNIQUE (challenge_id, bit)"]
+
+    present = {"challenge_tasks": ["uq_challenge_tasks_challenge_bit"]}
+    assert not [s for s in _run_upgrade(monkeypatch, present) if "ADD CONSTRAINT" in s]
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from backend.models import UserStreak
+from backend.streaks import _streaks_from_days, record_activity
+
+D = date(2026, 1, 1)
+
+
+def _day(n: int) -> date:
+    return D + timedelta(days=n)
+
+
+@pytest.fixture
+def db():
+    # the upsert is plain ON CONFLICT DO UPDATE + CASE, which SQLite runs as well
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _functions(conn, _):
+        conn.create_function("greatest", 2, lambda a, b: b if a is None else a if b is None else max(a, b))
+
+    UserStreak.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _streak(db: Session) -> tuple:
+    db.expire_all()
+    row = db.get(UserStreak, 1)
+    return row.current_streak, row.longest_streak, row.last_active_day
+
+
+def test_streaks_from_days():
+    assert _streaks_from_days([]) == (0, 0, None)
+    assert _streaks_from_days([_day(0), _day(1), _day(1), _day(2)]) == (3, 3, _day(2))
+    assert _streaks_from_days([_day(5), _day(0), _day(1), _day(6)]) == (2, 2, _day(6))
+    assert _streaks_from_days([_day(0), _day(1), _day(2), _day(9)]) == (1, 3, _day(9))
+
+
+def test_record_activity_advances_and_resets(db):
+    record_activity(db, 1, _day(0))
+    assert _streak(db) == (1, 1, _day(0))
+
+    record_activity(db, 1, _day(1))
+    record_activity(db, 1, _day(2))
+    assert _streak(db) == (3, 3, _day(2))
+
+    # a gap starts over, the longest streak is kept
+    record_activity(db, 1, _day(5))
+    assert _streak(db) == (1, 3, _day(5))
+
+
+def test_record_activity_ignores_same_day_and_older_days(db):
+    record_activity(db, 1, _day(0))
+    record_activity(db, 1, _day(1))
+    record_activity(db, 1, _day(1))
+    record_activity(db, 1, _day(0))
+    assert _streak(db) == (2, 2, _day(1))
+
+
+def test_record_activity_matches_a_full_rebuild(db):
+    days = [_day(n) for n in (0, 1, 2, 4, 5, 6, 7, 9)]
+    for day in days:
+        record_activity(db, 1, day)
+    assert _streak(db) == _streaks_from_days(days)
+
+
+def test_record_activity_without_user_or_day_is_a_no_op(db):
+    record_activity(db, None, _day(0))
+    record_activity(db, 1, None)
+    assert db.query(UserStreak).count() == 0
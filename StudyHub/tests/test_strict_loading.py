@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+# ORM_STRICT_LOADING is read when the models are imported, so the check runs in a fresh
+# interpreter against an in-memory SQLite copy of the challenge tables.
+SCRIPT = textwrap.dedent("""
+    import pytest
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+    from sqlalchemy.exc import InvalidRequestError
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import Session
+
+    @compiles(JSONB, "sqlite")
+    def _json(type_, compiler, **kw):
+        return "JSON"
+
+    @compiles(TSVECTOR, "sqlite")
+    def _text(type_, compiler, **kw):
+        return "TEXT"
+
+    from backend import models
+    from backend.challenges import (
+        CHALLENGE_VIEWS, FULL_LOAD, challenge_load_options, format_challenge_response,
+    )
+
+    assert models.STRICT_LOADING
+
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _functions(conn, _):
+        conn.create_function("to_tsvector", 2, lambda config, value: value, deterministic=True)
+        conn.create_function("setweight", 2, lambda vector, weight: vector, deterministic=True)
+
+    tables = [models.Challenge.__table__, models.ChallengeTask.__table__]
+    for table in tables:
+        table.indexes.clear()  # GIN / partial / NULLS LAST indexes are Postgres only
+    models.Base.metadata.create_all(engine, tables=tables)
+
+    with Session(engine) as db:
+        challenge = models.Challenge(
+            id=1, title="Read", creator_name="a", creator_id=1, participants=[1, 2], progress={"2": 1},
+        )
+        challenge.tasks = [models.ChallengeTask(id=10, title="ch. 1", position=0, bit=0)]
+        db.add(challenge)
+        db.commit()
+
+    db = Session(engine)
+
+    def load(*options):
+        db.expunge_all()  # a fresh instance, loaded with just these options
+        return db.query(models.Challenge).options(*options).one()
+
+    # list and detail views touch only what their options loaded
+    for view in ("card", "detail", "full"):
+        fields = CHALLENGE_VIEWS[view]
+        format_challenge_response(load(*challenge_load_options(fields, None)), None, fields)
+    format_challenge_response(load(*FULL_LOAD), 2)
+
+    card = load(*challenge_load_options(CHALLENGE_VIEWS["card"], None))
+    with pytest.raises(InvalidRequestError):
+        card.participants
+    with pytest.raises(InvalidRequestError):
+        card.comments
+""")
+
+
+def test_list_and_detail_loads_touch_nothing_unloaded():
+    env = dict(os.environ, ORM_STRICT_LOADING="1")
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
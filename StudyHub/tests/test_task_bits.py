@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.task_bits import (
+    assign_task_bits,
+    done_count,
+    next_free_bit,
+    ordered_tasks,
+    progress_array,
+    task_bit_map,
+    tasks_mask,
+    to_mask,
+)
+
+
+def _task(id, bit=None, position=None):
+    return SimpleNamespace(id=id, bit=bit, position=position)
+
+
+def test_to_mask():
+    assert to_mask(0b101) == 0b101
+    assert to_mask([1, 0, 1, 1]) == 0b1101
+    assert to_mask([]) == 0
+    # bools are ints in Python but never valid progress
+    assert to_mask(True) == 0
+    assert to_mask(None) == 0
+    assert to_mask("3") == 0
+
+
+def test_legacy_tasks_get_bits_in_id_order():
+    tasks = [_task(30), _task(10), _task(20)]
+    assert task_bit_map(tasks) == {10: 0, 20: 1, 30: 2}
+    # a legacy 0/1 list (indexed by id order) reads the same through the new bits
+    assert progress_array([1, 0, 1], ordered_tasks(tasks), task_bit_map(tasks)) == [1, 0, 1]
+
+
+def test_unassigned_tasks_go_after_the_highest_bit():
+    tasks = [_task(1, bit=0), _task(2, bit=3), _task(5), _task(4)]
+    assert task_bit_map(tasks) == {1: 0, 2: 3, 4: 4, 5: 5}
+
+
+def test_assign_task_bits_persists_bits_and_positions():
+    tasks = [_task(2), _task(1, bit=0, position=0), _task(3)]
+    assign_task_bits(tasks)
+    assert {t.id: (t.bit, t.position) for t in tasks} == {1: (0, 0), 2: (1, 1), 3: (2, 2)}
+
+    # idempotent: nothing moves on a second pass
+    assign_task_bits(tasks)
+    assert {t.id: (t.bit, t.position) for t in tasks} == {1: (0, 0), 2: (1, 1), 3: (2, 2)}
+
+
+def test_assign_task_bits_needs_flushed_tasks():
+    with pytest.raises(ValueError):
+        assign_task_bits([_task(None)])
+
+
+def test_next_free_bit_reuses_the_lowest_cleared_bit():
+    assert next_free_bit([]) == 0
+    assert next_free_bit([_task(1, bit=0), _task(2, bit=1)]) == 2
+    assert next_free_bit([_task(1, bit=0), _task(3, bit=2)]) == 1
+    assert next_free_bit([_task(2, bit=1), _task(3, bit=2)]) == 0
+
+
+def test_progress_array_follows_display_order_not_bits():
+    tasks = [_task(1, bit=0, position=2), _task(2, bit=1, position=0), _task(3, bit=2, position=1)]
+    ordered = ordered_tasks(tasks)
+    assert [t.id for t in ordered] == [2, 3, 1]
+    assert progress_array(0b001, ordered, task_bit_map(tasks)) == [0, 0, 1]
+
+
+def test_done_count_ignores_bits_of_removed_tasks():
+    bits = {1: 0, 3: 2}
+    assert tasks_mask(bits) == 0b101
+    assert done_count(0b111, tasks_mask(bits)) == 2
+    assert done_count([1, 1], tasks_mask(bits)) == 1